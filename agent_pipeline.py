@@ -6,49 +6,256 @@ This utility lets you run the main workflows without the Streamlit UI:
 - ``generator`` – create a full project from requirement documents or a text prompt.
 - ``analyzer`` – summarise an existing project for onboarding.
 - ``coder`` – generate new code for an existing project.
+- ``coder-batch`` – run ``coder`` for every prompt in a file concurrently.
+- ``repl`` – interactive session that keeps the index and model client loaded.
 """
 
+from __future__ import annotations
+
 import argparse
+import asyncio
+import io
 import json
+import mmap
 import os
+import pickle
+import sys
+import threading
 import zipfile
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from cache_utils import CACHE_DIR, atomic_write_bytes, cache_key, touch_cache_entry, trim_cache_dir
+
+# rag_system, project_orchestrator and model_adapter pull in torch, FAISS and
+# the provider SDKs, so they are imported inside the functions that need them.
+# This keeps ``--help`` fast and lets the imports overlap with file loading.
+if TYPE_CHECKING:
+    from model_adapter import ModelClient
+    from rag_system import EmbeddingCache, ProjectRAG
+
+# File reads are I/O bound, so use more threads than cores.
+MAX_IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Larger read buffer to cut down on read syscalls for big source files.
+READ_BUFFER_SIZE = 128 * 1024
+
+ZIP_WRITE_BUFFER_SIZE = 1 << 20
+# Single files larger than this are memory-mapped before decoding.
+FILE_MMAP_THRESHOLD = 1 << 20
+# Archives larger than this are memory-mapped and paged in by the OS.
+ZIP_MMAP_THRESHOLD = 100 * 1024 * 1024
+
+# Only source/text files are worth loading; everything else is skipped
+# before it is read so binaries never end up in memory or in the index.
+TEXT_EXTS = {
+    ".py", ".md", ".txt", ".json", ".yaml", ".yml", ".toml", ".ini", ".cfg",
+    ".rst", ".js", ".ts", ".tsx", ".jsx", ".html", ".css", ".java", ".go",
+    ".rs", ".c", ".h", ".cpp", ".hpp", ".sql", ".sh", ".rb", ".php", ".xml",
+}
+TEXT_FILENAMES = {"Dockerfile", "Makefile"}
+MAX_BYTES = 1_000_000
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "dist", "build"}
+# Retrieval results for near-identical coder prompts are reused for a week.
+SEMANTIC_CACHE_TTL = 7 * 24 * 3600
+
+# Fixed prompt scaffolding. It always comes first so the providers' prompt
+# caching can reuse it across runs.
+ANALYZER_PROMPT_PREFIX = (
+    "You are a senior developer. Provide a concise onboarding document for "
+    "the following project summary:\n"
+)
+CODER_PROMPT_PREFIX = (
+    "You are a senior developer extending an existing project. Use the project "
+    "context below to implement the requested feature.\n\n"
+    "Existing project context:\n"
+)
+
+# Bump when the loading rules change so stale cache entries are ignored.
+LOAD_CACHE_VERSION = 1
+
+
+def _is_text_file(name: str) -> bool:
+    """Return True if ``name`` looks like a text file we should load."""
+    base = os.path.basename(name)
+    return base in TEXT_FILENAMES or os.path.splitext(base)[1].lower() in TEXT_EXTS
+
+
+def _read_one(abs_path: str, rel_path: str) -> Tuple[str, str] | None:
+    """Read a single file, returning ``None`` if it cannot be read."""
+    try:
+        with open(
+            abs_path, "r", encoding="utf-8", errors="ignore", buffering=READ_BUFFER_SIZE
+        ) as f:
+            return rel_path, f.read()
+    except Exception:
+        return None
+
+
+class _MappedFile(io.RawIOBase):
+    """Minimal seekable file view over an ``mmap`` for ``ZipFile``."""
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mapped = mapped
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        self._mapped.seek(pos, whence)
+        return self._mapped.tell()
+
+    def tell(self) -> int:
+        return self._mapped.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        return self._mapped.read(size)
+
+
+def _open_zip(path: str, handles: List) -> zipfile.ZipFile:
+    """Open ``path`` as a zip, memory-mapping large archives.
+
+    Every object that needs closing is appended to ``handles``.
+    """
+    if os.path.getsize(path) > ZIP_MMAP_THRESHOLD:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        handles.append(mapped)
+        zf = zipfile.ZipFile(_MappedFile(mapped), "r")
+    else:
+        zf = zipfile.ZipFile(path, "r")
+    handles.insert(0, zf)
+    return zf
+
 
-from rag_system import ProjectRAG
-from project_orchestrator import create_project_orchestrator, GenerationOptions
-from model_adapter import ModelClient
+def _read_zip_member(
+    path: str, local: threading.local, handles: List, name: str
+) -> Tuple[str, str] | None:
+    """Read a zip member using a per-thread ``ZipFile`` handle."""
+    zf = getattr(local, "zf", None)
+    if zf is None:
+        # ZipFile objects are not safe to share between threads.
+        zf = local.zf = _open_zip(path, handles)
+    try:
+        return name, zf.read(name).decode("utf-8", errors="ignore")
+    except Exception:
+        return None
 
 
-def load_files(path: str) -> Dict[str, str]:
+def _walk_project(path: str) -> List[Tuple[str, str, os.stat_result]]:
+    """Collect ``(abs, rel, stat)`` for every loadable file under ``path``."""
+    entries = []
+    for root, dirnames, filenames in os.walk(path):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for fname in filenames:
+            if not _is_text_file(fname):
+                continue
+            fpath = os.path.join(root, fname)
+            try:
+                st = os.stat(fpath)
+            except OSError:
+                continue
+            if st.st_size > MAX_BYTES:
+                continue
+            entries.append((fpath, os.path.relpath(fpath, path), st))
+    return entries
+
+
+def _load_cache_path(path: str, entries: List[Tuple[str, str, os.stat_result]] | None) -> str:
+    """Return the cache file for ``path`` in its current on-disk state."""
+    parts = [str(LOAD_CACHE_VERSION), os.path.abspath(path)]
+    if entries is None:
+        st = os.stat(path)
+        parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+    else:
+        # Any added, removed or edited file changes the key.
+        parts.extend(f"{rel}:{st.st_mtime_ns}:{st.st_size}" for _, rel, st in entries)
+    return os.path.join(CACHE_DIR, "files", cache_key(*parts) + ".pkl")
+
+
+def load_files(path: str, use_cache: bool = True) -> Dict[str, str]:
     """Load text files from a directory or zip archive."""
+    entries = _walk_project(path) if os.path.isdir(path) else None
+    cache_path = _load_cache_path(path, entries) if use_cache else None
+    if cache_path:
+        try:
+            with open(cache_path, "rb") as f:
+                files = pickle.load(f)
+            touch_cache_entry(cache_path)
+            return files
+        except Exception:
+            pass
+
     files: Dict[str, str] = {}
-    if os.path.isdir(path):
-        for root, _, filenames in os.walk(path):
-            for fname in filenames:
-                fpath = os.path.join(root, fname)
-                try:
-                    with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                        rel = os.path.relpath(fpath, path)
-                        files[rel] = f.read()
-                except Exception:
-                    continue
+    if entries is not None:
+        paths = [(fpath, rel) for fpath, rel, _ in entries]
+        with ThreadPoolExecutor(max_workers=MAX_IO_WORKERS) as executor:
+            for item in executor.map(lambda p: _read_one(*p), paths, chunksize=32):
+                if item is not None:
+                    files[item[0]] = item[1]
     elif zipfile.is_zipfile(path):
-        with zipfile.ZipFile(path, "r") as zf:
-            for name in zf.namelist():
-                if name.endswith("/"):
-                    continue
-                try:
-                    with zf.open(name) as f:
-                        files[name] = f.read().decode("utf-8", errors="ignore")
-                except Exception:
-                    continue
+        handles: List = []
+        try:
+            zf = _open_zip(path, handles)
+            names = [
+                zi.filename
+                for zi in zf.infolist()
+                if not zi.is_dir()
+                and zi.file_size <= MAX_BYTES
+                and _is_text_file(zi.filename)
+                and not SKIP_DIRS.intersection(zi.filename.split("/")[:-1])
+            ]
+            local = threading.local()
+            with ThreadPoolExecutor(max_workers=MAX_IO_WORKERS) as executor:
+                reader = lambda n: _read_zip_member(path, local, handles, n)
+                for item in executor.map(reader, names, chunksize=32):
+                    if item is not None:
+                        files[item[0]] = item[1]
+        finally:
+            # ZipFiles come first so they close before their mmaps.
+            for handle in handles:
+                handle.close()
+    elif os.path.getsize(path) > FILE_MMAP_THRESHOLD:
+        # Decode straight from the mapping, skipping the intermediate bytes copy.
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            files[os.path.basename(path)] = str(mm, "utf-8", "ignore")
     else:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        with open(
+            path, "r", encoding="utf-8", errors="ignore", buffering=READ_BUFFER_SIZE
+        ) as f:
             files[os.path.basename(path)] = f.read()
+
+    if cache_path:
+        try:
+            atomic_write_bytes(cache_path, pickle.dumps(files, pickle.HIGHEST_PROTOCOL))
+            # Only this directory grows here; the rest of CACHE_DIR isn't walked
+            trim_cache_dir(os.path.dirname(cache_path))
+        except OSError:
+            pass
     return files
 
 
+def _section(title: str, body: str) -> str:
+    return f"\n=== {title} ===\n\n{body}\n"
+
+
+def _write_output(text: str) -> None:
+    """Write ``text`` to stdout in a single call."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
 def run_generator(docs: str | None, prompt: str | None, project: str) -> None:
+    from project_orchestrator import create_project_orchestrator, GenerationOptions
+
     orchestrator = create_project_orchestrator()
     options = GenerationOptions()
     if docs:
@@ -56,42 +263,324 @@ def run_generator(docs: str | None, prompt: str | None, project: str) -> None:
         result = orchestrator.generate_project_from_documents(documents, project, options)
     else:
         result = orchestrator.generate_project_from_prompt(prompt or "", project, options)
-    archive = orchestrator.export_project_as_zip(result)
     out = f"{project or 'generated_project'}.zip"
-    with open(out, "wb") as f:
-        f.write(archive)
-    print(f"\n✅ Project archive saved to {out}")
-    print(result.summary)
-
-
-def run_analyzer(project_path: str) -> None:
-    files = load_files(project_path)
-    rag = ProjectRAG()
-    rag.index_project_files(files)
-    summary = rag.generate_project_summary("default", "current")
-    prompt = (
-        "You are a senior developer. Provide a concise onboarding document for "
-        "the following project summary:\n" + json.dumps(summary, indent=2)
+    with open(out, "wb", buffering=ZIP_WRITE_BUFFER_SIZE) as f:
+        orchestrator.export_project_to_stream(result, f)
+    _write_output(f"\n✅ Project archive saved to {out}\n{result.summary}\n")
+
+
+def _project_fingerprint(files: Dict[str, str]) -> str:
+    """Return a hash identifying the exact contents of a loaded project."""
+    parts = []
+    for name in sorted(files):
+        parts.extend((name, files[name]))
+    return cache_key(*parts)
+
+
+_EMBEDDING_CACHE: EmbeddingCache | None = None
+
+
+def _create_rag(use_embed_cache: bool = True) -> ProjectRAG:
+    """Create a ProjectRAG backed by the shared on-disk embedding cache."""
+    from rag_system import EmbeddingCache, ProjectRAG
+
+    global _EMBEDDING_CACHE
+    index_dir = os.path.join(CACHE_DIR, "index")
+    if not use_embed_cache:
+        return ProjectRAG(storage_dir=index_dir)
+    if _EMBEDDING_CACHE is None:
+        _EMBEDDING_CACHE = EmbeddingCache(os.path.join(CACHE_DIR, "emb"))
+    return ProjectRAG(storage_dir=index_dir, embedding_cache=_EMBEDDING_CACHE)
+
+
+def _index_project(rag: ProjectRAG, files: Dict[str, str], fingerprint: str) -> None:
+    """Make ``files`` searchable in ``rag`` under ``fingerprint``.
+
+    The index is stored under the project's content fingerprint, so an
+    unchanged project is loaded from disk instead of being re-indexed.
+    """
+    from rag_system import deduplicate_files
+
+    if not rag.load_project("default", fingerprint):
+        rag.index_project("default", fingerprint, deduplicate_files(files)[0])
+
+
+def _warm_up(use_embed_cache: bool) -> Tuple[ProjectRAG, ModelClient]:
+    """Build the RAG and model clients and warm the embedder.
+
+    Meant to run in a worker thread while ``load_files`` reads the project.
+    The first ``encode`` call pays for tokenizer and kernel set-up, so a tiny
+    one is made here rather than on the indexing path.
+    """
+    from model_adapter import ModelClient
+    from rag_system import get_embedding_model
+
+    get_embedding_model().encode(["warm up"], normalize_embeddings=True)
+    return _create_rag(use_embed_cache), ModelClient()
+
+
+class _CoderContext:
+    """Retrieves coder context for one loaded project.
+
+    Results for near-identical prompts against the same project contents are
+    reused from a semantic cache, and the project is only indexed the first
+    time a prompt misses that cache. Cache lookups and updates happen on the
+    event loop thread; indexing and search run in worker threads.
+    """
+
+    def __init__(self, rag: ProjectRAG, files: Dict[str, str]):
+        from rag_system import SemanticCache, get_embedding_model
+
+        self.rag = rag
+        self.files = files
+        self.fingerprint = _project_fingerprint(files)
+        self.cache_path = os.path.join(CACHE_DIR, "semantic", f"{self.fingerprint}.pkl")
+        self.model = get_embedding_model()
+        self.cache = SemanticCache.load(self.cache_path) or SemanticCache(
+            self.model.get_sentence_embedding_dimension(), ttl=SEMANTIC_CACHE_TTL
+        )
+        self._index_lock = threading.Lock()
+        self._indexed = False
+
+    def ensure_indexed(self) -> None:
+        """Index the project (or load its saved index) if not done yet."""
+        with self._index_lock:
+            if not self._indexed:
+                _index_project(self.rag, self.files, self.fingerprint)
+                self._indexed = True
+
+    def _search(self, prompt: str) -> List:
+        self.ensure_indexed()
+        results = self.rag.search_project("default", self.fingerprint, prompt, k=3)
+        return [r.chunk for r in results]
+
+    async def retrieve(self, prompt: str) -> List:
+        """Return the chunks relevant to ``prompt``."""
+        query = (await asyncio.to_thread(
+            self.model.encode, [prompt], normalize_embeddings=True
+        ))[0]
+        chunks = self.cache.get(query)
+        if chunks is None:
+            chunks = await asyncio.to_thread(self._search, prompt)
+            self.cache.put(query, chunks)
+        return chunks
+
+    def save(self) -> None:
+        """Persist the semantic cache."""
+        try:
+            self.cache.save(self.cache_path)
+        except OSError:
+            pass
+
+
+def _dump_json(data) -> str:
+    """Serialise ``data`` as indented JSON, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(data, indent=2)
+
+
+def _format_context(chunks: List) -> str:
+    """Join retrieved chunks into the prompt context block.
+
+    Chunks are emitted in chunk-id order rather than relevance order, with
+    explicit boundaries, so prompts that retrieve overlapping chunks share
+    identical text that prefix caching can reuse. Only three chunks are
+    retrieved, so the lost ranking signal is negligible.
+    """
+    return "".join(
+        f"<<CHUNK {c.chunk_id}>>\n{c.content}\n<<END>>\n"
+        for c in sorted(chunks, key=lambda c: c.chunk_id)
     )
-    model = ModelClient()
-    analysis = model.generate_response(prompt)
-    print("\n=== Project Analysis ===\n")
-    print(analysis)
-
-
-def run_coder(project_path: str, prompt: str) -> None:
-    files = load_files(project_path)
-    rag = ProjectRAG()
-    rag.index_project_files(files)
-    context = rag.get_relevant_context("default", "current", prompt, max_chunks=3)
-    context_text = "\n\n".join(c.chunk.content for c in context)
-    full_prompt = (
-        f"Existing project context:\n{context_text}\n\nGenerate code for: {prompt}"
+
+
+async def cached_generate(
+    model: ModelClient,
+    prompt: str,
+    refresh: bool = False,
+    prefix_id: str | None = None,
+    prefix: str = "",
+) -> str:
+    """Generate a response, reusing the stored answer for an identical prompt.
+
+    When ``prefix_id`` is given the request is sent as ``prefix + prompt``
+    through the model's prefix-caching entry point.
+    """
+    from model_adapter import is_error_response
+
+    key = cache_key(model.model_name, prefix + prompt)
+    path = os.path.join(CACHE_DIR, "llm", key[:2], f"{key}.txt")
+    if not refresh:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = f.read()
+            # Errors stored before they were recognised are treated as misses
+            if not is_error_response(cached):
+                return cached
+        except OSError:
+            pass
+    if prefix_id:
+        response = await asyncio.to_thread(
+            model.generate_with_kv_prefix, prefix_id, prefix, prompt
+        )
+    else:
+        response = await model.agenerate_response(prompt)
+    if not is_error_response(response):
+        try:
+            atomic_write_bytes(path, response.encode("utf-8"))
+        except OSError:
+            pass
+    return response
+
+
+async def _analyze(
+    rag: ProjectRAG, files: Dict[str, str], fingerprint: str, model: ModelClient, refresh: bool
+) -> str:
+    """Produce the onboarding analysis for an indexed project."""
+    from rag_system import deduplicate_files
+
+    summary = rag.generate_project_summary("default", fingerprint)
+    aliases = deduplicate_files(files)[1]
+    duplicates = {path: paths[1:] for path, paths in aliases.items() if len(paths) > 1}
+    if duplicates:
+        summary["total_files"] = len(files)
+        summary["duplicate_files"] = duplicates
+    # The timestamp would make every prompt unique and defeat prompt caching.
+    summary.pop("indexed_at", None)
+    return await cached_generate(
+        model, _dump_json(summary), refresh, "analyzer", ANALYZER_PROMPT_PREFIX
+    )
+
+
+async def run_analyzer(
+    project_path: str, use_embed_cache: bool = True, refresh: bool = False
+) -> None:
+    # Warm up the embedder and clients while the project files are being read.
+    files, (rag, model) = await asyncio.gather(
+        asyncio.to_thread(load_files, project_path),
+        asyncio.to_thread(_warm_up, use_embed_cache),
     )
-    model = ModelClient()
-    response = model.generate_response(full_prompt)
-    print("\n=== Generated Code ===\n")
-    print(response)
+    fingerprint = _project_fingerprint(files)
+    await asyncio.to_thread(_index_project, rag, files, fingerprint)
+    analysis = await _analyze(rag, files, fingerprint, model, refresh)
+    _write_output(_section("Project Analysis", analysis))
+
+
+async def _generate_code(
+    context: _CoderContext, model: ModelClient, prompt: str, refresh: bool
+) -> str:
+    """Generate code for ``prompt`` using the retrieved project context."""
+    chunks = await context.retrieve(prompt)
+    return await cached_generate(
+        model,
+        f"{_format_context(chunks)}\n\nGenerate code for: {prompt}",
+        refresh,
+        "coder",
+        CODER_PROMPT_PREFIX,
+    )
+
+
+async def _load_coder_context(
+    project_path: str, use_embed_cache: bool
+) -> Tuple[_CoderContext, ModelClient]:
+    files, (rag, model) = await asyncio.gather(
+        asyncio.to_thread(load_files, project_path),
+        asyncio.to_thread(_warm_up, use_embed_cache),
+    )
+    return await asyncio.to_thread(_CoderContext, rag, files), model
+
+
+async def run_coder(
+    project_path: str, prompt: str, use_embed_cache: bool = True, refresh: bool = False
+) -> None:
+    context, model = await _load_coder_context(project_path, use_embed_cache)
+    response = await _generate_code(context, model, prompt, refresh)
+    context.save()
+    _write_output(_section("Generated Code", response))
+
+
+async def run_coder_batch(
+    project_path: str, prompts_file: str, use_embed_cache: bool = True, refresh: bool = False
+) -> None:
+    with open(prompts_file, "r", encoding="utf-8") as f:
+        prompts = [line.strip() for line in f if line.strip()]
+    context, model = await _load_coder_context(project_path, use_embed_cache)
+    semaphore = asyncio.Semaphore(int(os.environ.get("AGENT_MAX_CONCURRENCY", "8")))
+
+    async def _one(prompt: str) -> str:
+        async with semaphore:
+            return await _generate_code(context, model, prompt, refresh)
+
+    responses = await asyncio.gather(*(_one(p) for p in prompts))
+    context.save()
+    _write_output("".join(
+        _section(f"Generated Code: {prompt}", response)
+        for prompt, response in zip(prompts, responses)
+    ))
+
+
+REPL_HELP = """Commands:
+  analyze          onboarding summary of the project
+  code <prompt>    generate code for a feature
+  regen            re-run the last command, ignoring cached responses
+  help             show this message
+  quit             leave the REPL
+"""
+
+
+def _line_reader():
+    """Return an async ``read(prompt)`` using prompt_toolkit when available."""
+    try:
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.history import FileHistory
+    except ImportError:
+        return lambda message: asyncio.to_thread(input, message)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    session = PromptSession(history=FileHistory(os.path.join(CACHE_DIR, "repl_history")))
+    return session.prompt_async
+
+
+async def run_repl(project_path: str, use_embed_cache: bool = True) -> None:
+    """Interactive loop that keeps one index and model client alive."""
+    context, model = await _load_coder_context(project_path, use_embed_cache)
+    await asyncio.to_thread(context.ensure_indexed)
+    read_line = _line_reader()
+    _write_output(f"Loaded {len(context.files)} files from {project_path}.\n{REPL_HELP}")
+
+    last: Tuple[str, str] | None = None
+    while True:
+        try:
+            line = (await read_line("agent> ")).strip()
+        except (EOFError, KeyboardInterrupt):
+            break
+        command, _, arg = line.partition(" ")
+        arg = arg.strip()
+        refresh = False
+        if command == "regen":
+            if last is None:
+                _write_output("Nothing to regenerate yet.\n")
+                continue
+            (command, arg), refresh = last, True
+
+        if not command:
+            continue
+        if command in ("quit", "exit"):
+            break
+        if command == "analyze":
+            analysis = await _analyze(
+                context.rag, context.files, context.fingerprint, model, refresh
+            )
+            _write_output(_section("Project Analysis", analysis))
+        elif command == "code" and arg:
+            response = await _generate_code(context, model, arg, refresh)
+            _write_output(_section("Generated Code", response))
+        else:
+            _write_output(REPL_HELP)
+            continue
+        last = (command, arg)
+
+    context.save()
 
 
 def main() -> None:
@@ -105,19 +594,46 @@ def main() -> None:
 
     ana = sub.add_parser("analyzer", help="Analyse an existing project")
     ana.add_argument("project", help="Path to project directory or zip")
+    ana.add_argument("--no-embed-cache", action="store_true", help="Re-embed every chunk")
+    ana.add_argument("--refresh", action="store_true", help="Ignore cached model responses")
 
     cod = sub.add_parser("coder", help="Generate code for an existing project")
     cod.add_argument("project", help="Path to project directory or zip")
     cod.add_argument("prompt", help="Feature description")
+    cod.add_argument("--no-embed-cache", action="store_true", help="Re-embed every chunk")
+    cod.add_argument("--refresh", action="store_true", help="Ignore cached model responses")
+
+    batch = sub.add_parser("coder-batch", help="Generate code for several prompts at once")
+    batch.add_argument("project", help="Path to project directory or zip")
+    batch.add_argument("--prompts-file", required=True, help="File with one prompt per line")
+    batch.add_argument("--no-embed-cache", action="store_true", help="Re-embed every chunk")
+    batch.add_argument("--refresh", action="store_true", help="Ignore cached model responses")
+
+    repl = sub.add_parser("repl", help="Interactive analyzer/coder session for a project")
+    repl.add_argument("project", help="Path to project directory or zip")
+    repl.add_argument("--no-embed-cache", action="store_true", help="Re-embed every chunk")
 
     args = parser.parse_args()
+    # Output is written in whole sections, so line buffering only adds syscalls.
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(line_buffering=False)
 
     if args.command == "generator":
         run_generator(args.docs, args.prompt, args.project)
     elif args.command == "analyzer":
-        run_analyzer(args.project)
+        asyncio.run(run_analyzer(args.project, not args.no_embed_cache, args.refresh))
     elif args.command == "coder":
-        run_coder(args.project, args.prompt)
+        asyncio.run(
+            run_coder(args.project, args.prompt, not args.no_embed_cache, args.refresh)
+        )
+    elif args.command == "coder-batch":
+        asyncio.run(
+            run_coder_batch(
+                args.project, args.prompts_file, not args.no_embed_cache, args.refresh
+            )
+        )
+    elif args.command == "repl":
+        asyncio.run(run_repl(args.project, not args.no_embed_cache))
 
 
 if __name__ == "__main__":
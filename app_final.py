@@ -1,18 +1,28 @@
 import streamlit as st
 from firebase_utils import (
     sign_in, sign_up, get_user_id,
-    list_user_chats, create_new_chat, get_chat_history, add_message_to_chat, set_chat_title
+    list_user_chats, create_new_chat, get_chat_history, add_message_to_chat, set_chat_title,
+    upload_chat_index, download_chat_index, regenerate_chat_title, db
 )
-from gemini_utils import generate_gemini_response
-from openai_utils import generate_openai_response
+from gemini_utils import generate_gemini_response, generate_gemini_response_async, stream_gemini_response
+from openai_utils import generate_openai_response, generate_openai_response_async, stream_openai_response
+from model_adapter import is_error_response
+from cache_utils import CACHE_DIR, atomic_write_bytes, cache_key
 from dotenv import load_dotenv
 import os
+import asyncio
+import functools
+from itertools import islice
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from streamlit.components.v1 import html
 import PyPDF2
-from io import BytesIO
+from io import BytesIO, StringIO
 import re
 from datetime import datetime
 import tempfile
+from types import MappingProxyType
 from typing import Dict, List, Optional
 import zipfile
 import json
@@ -23,12 +33,25 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
+# Faster JSON serialisation
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Native PDF text extraction (much faster than PyPDF2)
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
 # Enhanced imports (with fallbacks)
 try:
     import sentence_transformers
     import numpy as np
-    import faiss
-    from rag_system import ProjectRAG
+    from rag_system import ProjectRAG, SemanticCache, deduplicate_files, get_embedding_model
     from model_adapter import ModelClient
     from git_repository_integration import GitRepositoryIntegration
     RAG_AVAILABLE = True
@@ -49,6 +72,139 @@ except ImportError:
 
 load_dotenv()
 
+# Sidebar model choices grouped by provider, with selectbox index lookups
+_MODEL_CATEGORIES = {
+    "Gemini": {
+        "gemini-2.5-pro": "Gemini 2.5 Pro",
+        "gemini-1.5-pro": "Gemini 1.5 Pro",
+        "gemini-1.5-flash": "Gemini 1.5 Flash"
+    },
+    "OpenAI": {
+        "gpt-4o": "GPT-4o",
+        "gpt-4o-mini": "GPT-4o Mini",
+        "gpt-4-turbo": "GPT-4 Turbo",
+        "gpt-3.5-turbo": "GPT-3.5 Turbo"
+    }
+}
+_PROVIDER_LIST = tuple(_MODEL_CATEGORIES)
+_PROVIDER_INDEX = {p: i for i, p in enumerate(_PROVIDER_LIST)}
+_MODEL_KEYS = {p: tuple(models) for p, models in _MODEL_CATEGORIES.items()}
+_MODEL_INDEX = {p: {m: i for i, m in enumerate(keys)} for p, keys in _MODEL_KEYS.items()}
+# Display name of every model, for the chat header
+_MODEL_DISPLAY_NAMES = {m: name for models in _MODEL_CATEGORIES.values() for m, name in models.items()}
+
+# Assistant types offered above the chat input
+_AGENT_OPTIONS = (
+    "🚀 Project Generator",
+    "🔍 Project Analyzer",
+    "🛠️ Code Assistant"
+)
+_AGENT_INDEX = {agent: i for i, agent in enumerate(_AGENT_OPTIONS)}
+
+# Status banner for each interactive Project Generator step
+_WORKFLOW_STATUS = {
+    "tech_stack_selection": "🎯 **Tech Stack Selection** - Choose your preferred technology stack",
+    "architecture_review": "🏗️ **Architecture Review** - Review and confirm project structure",
+    "group_generation": "💻 **File Generation** - Generating complete code files in groups"
+}
+
+# Concurrent file-group generation
+FILE_GROUP_CONCURRENCY = 8
+SEQUENTIAL_GROUP_KEYWORDS = ("test", "deploy", "devops", "documentation")
+
+# Project Generator prompts treated as small talk (bare or with "!" / ".")
+SIMPLE_REQUESTS = frozenset(
+    word + suffix
+    for word in ("hi", "hello", "thanks", "thank you", "ok", "okay", "good", "great")
+    for suffix in ("", "!", ".")
+)
+# Fixed answers for small talk that needs no model call
+CANNED_REPLIES = {
+    "hi": "👋 Hi! How can I help with your project today?",
+    "hello": "👋 Hello! What would you like to build?",
+    "hey": "👋 Hey! What would you like to build?",
+    "thanks": "😊 You're welcome! Let me know what you'd like to do next.",
+    "thank you": "😊 You're welcome! Let me know what you'd like to do next.",
+    "ok": "👍 Great! Tell me what you'd like to do next.",
+    "okay": "👍 Great! Tell me what you'd like to do next.",
+}
+# Substrings that mark a prompt as part of the generation workflow
+SYSTEMATIC_KEYWORDS = ("option", "stack", "group", "continue", "generate", "django", "fastapi", "flask", "react", "1", "2", "3")
+_DIGIT_RE = re.compile(r'\d')
+# Follow-up keywords at the start of a word ("fixes" matches, "prefix" doesn't)
+_FOLLOWUP_RE = re.compile(
+    r'\b(?:fix|add|modify|change|update|improve|explain|how|why|error|issue|problem|help)',
+    re.IGNORECASE,
+)
+
+# Prompt-independent searches that add background context for code generation
+ADDITIONAL_RAG_QUERIES = (
+    "architecture patterns design structure",
+    "dependencies requirements configuration",
+    "testing validation best practices",
+    "security authentication authorization",
+)
+
+# Minimum cosine similarity for a follow-up prompt to reuse a cached answer
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_TTL = 7 * 24 * 3600
+
+# Firestore rejects write batches with more than 500 operations
+FIRESTORE_BATCH_SIZE = 500
+
+# Worker threads used to parse uploaded files
+MAX_EXTRACT_WORKERS = min(8, os.cpu_count() or 1)
+
+# Zip members are classified by extension first; anything else is sniffed
+TEXT_FILE_EXTENSIONS = frozenset({
+    '.py', '.js', '.ts', '.jsx', '.tsx', '.md', '.txt', '.json', '.yml', '.yaml',
+    '.html', '.css', '.sql', '.env', '.gitignore', '.toml', '.ini', '.cfg', '.sh', '.xml',
+})
+# Uploads treated as requirements documents rather than code
+DOC_FILE_EXTENSIONS = frozenset({'.docx', '.doc', '.pdf', '.txt', '.md'})
+BINARY_FILE_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.pdf', '.zip', '.gz',
+    '.tar', '.jar', '.whl', '.exe', '.dll', '.so', '.dylib', '.pyc', '.class',
+    '.woff', '.woff2', '.ttf', '.otf', '.mp3', '.mp4', '.mov', '.sqlite', '.db',
+})
+BINARY_MAGIC_PREFIXES = (b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'PK\x03\x04', b'%PDF', b'\x7fELF', b'MZ')
+SNIFF_BYTES = 512
+
+# Characters that aren't allowed in archive member names on Windows
+ZIP_PATH_SANITIZE_TABLE = str.maketrans({c: '_' for c in '<>:"|?*'})
+
+# Initial project generator state; copy it with new_project_generation_state()
+_DEFAULT_PROJECT_GEN_STATE = {
+    "is_generating": False,
+    "current_step": None,
+    "generated_files": [],
+    "project_name": "",
+    "tech_stack": [],
+    "architecture": "",
+    "user_feedback": "",
+    "generation_complete": False,
+    "zip_data": None,
+    # New interactive workflow states
+    "workflow_step": "initial",  # initial, tech_stack_selection, architecture_review, group_generation, complete
+    "requirements": "",
+    "suggested_tech_stack": {},
+    "selected_tech_stack": "",
+    "project_architecture": "",
+    "file_groups": [],
+    "current_group_index": 0,
+    "generated_groups": [],
+    "user_confirmations": {},
+    "prefetched_groups": {},
+    "project_description": ""
+}
+
+def new_project_generation_state():
+    """Return a fresh copy of the default project generation state."""
+    # The only mutable defaults are empty containers, so recreating them is
+    # enough and much cheaper than a deepcopy
+    return {key: type(value)() if isinstance(value, (list, dict)) else value
+            for key, value in _DEFAULT_PROJECT_GEN_STATE.items()}
+
 st.set_page_config(page_title="MultiModel ChatBot", layout="wide")
 
 # Initialize session state
@@ -71,31 +227,19 @@ if "search_query" not in st.session_state:
 if "auto_send_prompt" not in st.session_state:
     st.session_state.auto_send_prompt = ""
 if "project_generation_state" not in st.session_state:
-    st.session_state.project_generation_state = {
-        "is_generating": False,
-        "current_step": None,
-        "generated_files": [],
-        "project_name": "",
-        "tech_stack": [],
-        "architecture": "",
-        "user_feedback": "",
-        "generation_complete": False,
-        "zip_data": None,
-        # New interactive workflow states
-        "workflow_step": "initial",  # initial, tech_stack_selection, architecture_review, group_generation, complete
-        "requirements": "",
-        "suggested_tech_stack": {},
-        "selected_tech_stack": "",
-        "project_architecture": "",
-        "file_groups": [],
-        "current_group_index": 0,
-        "generated_groups": [],
-        "user_confirmations": {},
-        "project_description": ""
-    }
+    st.session_state.project_generation_state = new_project_generation_state()
 if "project_generation_history" not in st.session_state:
     st.session_state.project_generation_history = []
 
+def is_doc_file(filename: str) -> bool:
+    """True if the file's extension marks it as a requirements document."""
+    return os.path.splitext(filename)[1].lower() in DOC_FILE_EXTENSIONS
+
+# Fenced ```mermaid blocks in model output; group 1 is the diagram source
+_MERMAID_BLOCK_RE = re.compile(r'```mermaid(.*?)```', re.DOTALL)
+# Heading of the chat messages added by the Diagram button
+DIAGRAM_MESSAGE_HEADER = "📊 **Generated Workflow Diagram:**"
+
 # Helper functions
 def render_mermaid(mermaid_code: str):
     """Render Mermaid diagram in Streamlit using HTML and Mermaid.js CDN."""
@@ -124,100 +268,143 @@ def render_mermaid(mermaid_code: str):
         st.error(f"❌ Error rendering Mermaid diagram: {str(e)}")
         st.code(mermaid_code, language="mermaid")
 
-def extract_files_from_uploaded(uploaded_files):
-    """Extract content from uploaded files including zip archives and Word documents."""
-    files_content = {}
+def _extract_zip_members(file_bytes, prefix):
+    """Decode the text members of a zip archive, reading members in parallel."""
+    local = threading.local()
     
-    for uploaded_file in uploaded_files:
+    def read_member(file_info):
+        # ZipFile handles aren't safe to share, so each worker opens its own;
+        # BytesIO over an immutable bytes object shares it rather than copying
+        zip_file = getattr(local, "zip_file", None)
+        if zip_file is None:
+            zip_file = local.zip_file = zipfile.ZipFile(BytesIO(file_bytes))
         try:
-            file_name = uploaded_file.name.lower()
-            
-            if file_name.endswith('.zip'):
-                # Handle zip files
-                file_bytes = uploaded_file.read()
-                with zipfile.ZipFile(BytesIO(file_bytes)) as zip_file:
-                    for file_info in zip_file.infolist():
-                        if not file_info.is_dir() and file_info.file_size < 500000:  # 500KB limit per file
-                            try:
-                                with zip_file.open(file_info) as inner_file:
-                                    inner_content = inner_file.read().decode('utf-8')
-                                    # Preserve folder structure in filename
-                                    display_name = f"{uploaded_file.name[:-4]}/{file_info.filename}"
-                                    files_content[display_name] = inner_content
-                            except UnicodeDecodeError:
-                                # Skip binary files
-                                continue
-                            except Exception as e:
-                                # Skip files with other errors
-                                continue
-                                
-            elif file_name.endswith('.docx') and DOCX_AVAILABLE:
-                # Handle Word .docx files
-                try:
-                    file_bytes = uploaded_file.read()
-                    # Method 1: Try using python-docx
+            with zip_file.open(file_info) as inner_file:
+                if os.path.splitext(file_info.filename)[1].lower() in TEXT_FILE_EXTENSIONS:
+                    data = inner_file.read()
+                else:
+                    # Unknown type: peek at the head before inflating the rest
+                    head = inner_file.read(SNIFF_BYTES)
+                    if b'\x00' in head or head.startswith(BINARY_MAGIC_PREFIXES):
+                        return None
+                    data = head + inner_file.read()
+                return file_info.filename, data.decode('utf-8')
+        except UnicodeDecodeError:
+            # Skip binary files
+            return None
+        except Exception:
+            # Skip files with other errors
+            return None
+    
+    with zipfile.ZipFile(BytesIO(file_bytes)) as zip_file:
+        members = [
+            info for info in zip_file.infolist()
+            if not info.is_dir() and info.file_size < 500000  # 500KB limit per file
+            and os.path.splitext(info.filename)[1].lower() not in BINARY_FILE_EXTENSIONS
+        ]
+    
+    files_content = {}
+    with ThreadPoolExecutor(max_workers=MAX_EXTRACT_WORKERS) as executor:
+        for result in executor.map(read_member, members):
+            if result is not None:
+                # Preserve folder structure in filename
+                files_content[f"{prefix}/{result[0]}"] = result[1]
+    return files_content
+
+def _extract_pdf_text(file_bytes):
+    """Extract the text of every page, preferring PDFium over PyPDF2."""
+    if PDFIUM_AVAILABLE:
+        try:
+            pdf = pdfium.PdfDocument(file_bytes)
+            try:
+                return '\n'.join(page.get_textpage().get_text_range() for page in pdf)
+            finally:
+                pdf.close()
+        except Exception:
+            pass  # fall back to PyPDF2
+    pdf_reader = PyPDF2.PdfReader(BytesIO(file_bytes))
+    content = []
+    for page in pdf_reader.pages:
+        content.append(page.extract_text())
+    return '\n'.join(content)
+
+def _extract_docx_text(file_bytes):
+    """Extract the paragraph text of a .docx, falling back to docx2txt."""
+    try:
+        doc = Document(BytesIO(file_bytes))
+        return '\n'.join(paragraph.text for paragraph in doc.paragraphs)
+    except Exception:
+        # docx2txt unzips from any file object, so no temp file is needed
+        return docx2txt.process(BytesIO(file_bytes))
+
+def _extract_one(uploaded_file):
+    """Extract the content of a single uploaded file as {name: content}."""
+    files_content = {}
+    try:
+        file_name = uploaded_file.name.lower()
+        
+        if file_name.endswith('.zip'):
+            # Handle zip files; getvalue() hands back the upload's own buffer,
+            # where read() would copy the whole archive first
+            file_bytes = uploaded_file.getvalue()
+            files_content.update(_extract_zip_members(file_bytes, uploaded_file.name[:-4]))
+                            
+        elif file_name.endswith('.docx') and DOCX_AVAILABLE:
+            # Handle Word .docx files
+            try:
+                files_content[uploaded_file.name] = _extract_docx_text(uploaded_file.getvalue())
+            except Exception as e:
+                files_content[uploaded_file.name] = f"[Error extracting Word document: {str(e)}]"
+                
+        elif file_name.endswith('.doc') and DOCX_AVAILABLE:
+            # Handle older Word .doc files (limited support)
+            try:
+                file_bytes = uploaded_file.getvalue()
+                with tempfile.NamedTemporaryFile(suffix='.doc', delete=False) as tmp_file:
+                    tmp_file.write(file_bytes)
+                    tmp_file.flush()
                     try:
-                        doc = Document(BytesIO(file_bytes))
-                        content = []
-                        for paragraph in doc.paragraphs:
-                            content.append(paragraph.text)
-                        files_content[uploaded_file.name] = '\n'.join(content)
-                    except Exception as e:
-                        # Method 2: Fallback to docx2txt
-                        try:
-                            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp_file:
-                                tmp_file.write(file_bytes)
-                                tmp_file.flush()
-                                content = docx2txt.process(tmp_file.name)
-                                files_content[uploaded_file.name] = content
-                                os.unlink(tmp_file.name)  # Clean up temp file
-                        except Exception as e2:
-                            files_content[uploaded_file.name] = f"[Error extracting Word document: {str(e2)}]"
-                except Exception as e:
-                    files_content[uploaded_file.name] = f"[Error extracting Word document: {str(e)}]"
-                    
-            elif file_name.endswith('.doc') and DOCX_AVAILABLE:
-                # Handle older Word .doc files (limited support)
-                try:
-                    file_bytes = uploaded_file.read()
-                    with tempfile.NamedTemporaryFile(suffix='.doc', delete=False) as tmp_file:
-                        tmp_file.write(file_bytes)
-                        tmp_file.flush()
-                        try:
-                            content = docx2txt.process(tmp_file.name)
-                            files_content[uploaded_file.name] = content
-                        except:
-                            # If docx2txt fails, mark as unsupported
-                            files_content[uploaded_file.name] = f"[Unsupported .doc format - please save as .docx: {uploaded_file.name}]"
-                        os.unlink(tmp_file.name)  # Clean up temp file
-                except Exception as e:
-                    files_content[uploaded_file.name] = f"[Error processing .doc file: {str(e)}]"
-                    
-            elif file_name.endswith('.pdf'):
-                # Handle PDF files
-                try:
-                    file_bytes = uploaded_file.read()
-                    pdf_reader = PyPDF2.PdfReader(BytesIO(file_bytes))
-                    content = []
-                    for page in pdf_reader.pages:
-                        content.append(page.extract_text())
-                    files_content[uploaded_file.name] = '\n'.join(content)
-                except Exception as e:
-                    files_content[uploaded_file.name] = f"[Error reading PDF: {str(e)}]"
-                    
-            else:
-                # Handle regular text files
-                content = uploaded_file.read().decode('utf-8')
-                files_content[uploaded_file.name] = content
+                        content = docx2txt.process(tmp_file.name)
+                        files_content[uploaded_file.name] = content
+                    except:
+                        # If docx2txt fails, mark as unsupported
+                        files_content[uploaded_file.name] = f"[Unsupported .doc format - please save as .docx: {uploaded_file.name}]"
+                    os.unlink(tmp_file.name)  # Clean up temp file
+            except Exception as e:
+                files_content[uploaded_file.name] = f"[Error processing .doc file: {str(e)}]"
                 
-        except UnicodeDecodeError:
-            # Check if Word documents are not supported
-            if (file_name.endswith('.docx') or file_name.endswith('.doc')) and not DOCX_AVAILABLE:
-                files_content[uploaded_file.name] = f"[Word document support not available - install: pip install python-docx docx2txt]"
-            else:
-                files_content[uploaded_file.name] = f"[Binary file: {uploaded_file.name}]"
-        except Exception as e:
-            files_content[uploaded_file.name] = f"[Error reading {uploaded_file.name}: {str(e)}]"
+        elif file_name.endswith('.pdf'):
+            # Handle PDF files
+            try:
+                file_bytes = uploaded_file.getvalue()
+                files_content[uploaded_file.name] = _extract_pdf_text(file_bytes)
+            except Exception as e:
+                files_content[uploaded_file.name] = f"[Error reading PDF: {str(e)}]"
+                
+        else:
+            # Handle regular text files
+            content = uploaded_file.getvalue().decode('utf-8')
+            files_content[uploaded_file.name] = content
+            
+    except UnicodeDecodeError:
+        # Check if Word documents are not supported
+        if (file_name.endswith('.docx') or file_name.endswith('.doc')) and not DOCX_AVAILABLE:
+            files_content[uploaded_file.name] = f"[Word document support not available - install: pip install python-docx docx2txt]"
+        else:
+            files_content[uploaded_file.name] = f"[Binary file: {uploaded_file.name}]"
+    except Exception as e:
+        files_content[uploaded_file.name] = f"[Error reading {uploaded_file.name}: {str(e)}]"
+    
+    return files_content
+
+def extract_files_from_uploaded(uploaded_files):
+    """Extract content from uploaded files including zip archives and Word documents."""
+    files_content = {}
+    
+    # Files are independent, so parse them in parallel and merge in upload order
+    with ThreadPoolExecutor(max_workers=MAX_EXTRACT_WORKERS) as executor:
+        for extracted in executor.map(_extract_one, uploaded_files):
+            files_content.update(extracted)
     
     return files_content
 
@@ -228,7 +415,7 @@ def initialize_rag_system(files_content, user_id=None, chat_id=None):
         
     try:
         if st.session_state.project_rag is None:
-            st.session_state.project_rag = ProjectRAG()
+            st.session_state.project_rag = ProjectRAG(quantization=st.session_state.get('rag_quant', 'binary'))
         
         # Use chat-specific project ID if available
         if chat_id:
@@ -239,10 +426,14 @@ def initialize_rag_system(files_content, user_id=None, chat_id=None):
         if not user_id:
             user_id = "default"
         
+        # Identical files (vendored copies, boilerplate) are embedded once
+        unique_files, aliases = deduplicate_files(files_content)
+        file_aliases = {path: paths[1:] for path, paths in aliases.items() if len(paths) > 1}
+        
         # Index the project files with chat-specific context
         with st.spinner("🧠 Creating semantic embeddings with RAG..."):
             st.session_state.project_rag.index_project_files(
-                files_content, 
+                unique_files, 
                 user_id=user_id, 
                 project_id=project_id
             )
@@ -250,6 +441,7 @@ def initialize_rag_system(files_content, user_id=None, chat_id=None):
         # Store project context
         project_context = {
             'files': files_content,
+            'file_aliases': file_aliases,
             'total_files': len(files_content),
             'indexed': True,
             'last_updated': datetime.now().isoformat(),
@@ -263,14 +455,22 @@ def initialize_rag_system(files_content, user_id=None, chat_id=None):
         # Save context to Firebase if we have a chat ID
         if chat_id and user_id:
             save_chat_context(user_id, chat_id, project_context)
+            # Keep a copy of the index so restoring the chat elsewhere skips re-embedding
+            try:
+                upload_chat_index(user_id, chat_id, st.session_state.project_rag.store_path(user_id, project_id))
+            except Exception:
+                pass
         
         return True
     except Exception as e:
         st.error(f"❌ Failed to initialize RAG system: {str(e)}")
         return False
 
-def get_rag_context(query, max_results=5):
-    """Get relevant context from RAG system using chat-specific context."""
+def get_rag_context(query, max_results=5, nprobe=None):
+    """
+    Get relevant context from RAG system using chat-specific context.
+    nprobe trades recall for latency on large (IVF-indexed) projects.
+    """
     if not RAG_AVAILABLE or not st.session_state.project_rag or not st.session_state.project_context.get('indexed'):
         return []
         
@@ -283,37 +483,144 @@ def get_rag_context(query, max_results=5):
             query, 
             top_k=max_results,
             user_id=user_id,
-            project_id=project_id
+            project_id=project_id,
+            nprobe=nprobe
         )
+        
+        # Surface every path that shares a matched file's content
+        file_aliases = st.session_state.project_context.get('file_aliases', {})
+        if file_aliases:
+            expanded = []
+            for result in results:
+                expanded.append(result)
+                expanded.extend({**result, 'file': alias} for alias in file_aliases.get(result['file'], []))
+            results = expanded
         return results
     except Exception as e:
         st.warning(f"⚠️ RAG search failed: {str(e)}")
         return []
 
+def get_static_rag_context(query, max_results=5):
+    """
+    get_rag_context for prompt-independent queries.
+    Their results only change with the indexed files, so each query is searched
+    once per uploaded project instead of on every chat turn.
+    """
+    project_context = st.session_state.project_context
+    if not project_context.get('indexed'):
+        return get_rag_context(query, max_results)
+    key = (project_context.get('project_id'), project_files_hash(project_context), query, max_results)
+    cache = st.session_state.setdefault('static_rag_cache', {})
+    if key not in cache:
+        results = get_rag_context(query, max_results)
+        if not results:
+            return results  # don't remember failed or empty searches
+        cache[key] = results
+    return list(cache[key])
+
+def _cached_user_chats(user_id, model_type):
+    """Return the cached (key, chats, lowercased titles) entry, fetching on a miss."""
+    key = (user_id, model_type)
+    cached = st.session_state.get('chat_list_cache')
+    if cached is None or cached[0] != key:
+        chats = list_user_chats(user_id, model_type)
+        if not chats:
+            return key, chats, []  # empty or failed fetch; try again next time
+        titles_lc = [c["title"].lower() for c in chats]
+        cached = st.session_state['chat_list_cache'] = (key, chats, titles_lc)
+    return cached
+
+def get_user_chats(user_id, model_type, search_query=""):
+    """
+    Return list_user_chats(user_id, model_type), cached in session state and
+    optionally filtered by a case-insensitive title search.
+    Sidebar reruns (search keystrokes, clicks) reuse the list; call
+    invalidate_chat_list() after creating, deleting or updating a chat.
+    """
+    _, chats, titles_lc = _cached_user_chats(user_id, model_type)
+    if not search_query:
+        return chats
+    search_lower = search_query.lower()
+    return [c for c, title in zip(chats, titles_lc) if search_lower in title]
+
+def invalidate_chat_list():
+    """Drop the cached sidebar chat list."""
+    st.session_state.pop('chat_list_cache', None)
+
+@functools.lru_cache(maxsize=256)
+def _chat_ref(user_id, chat_id):
+    """Return the (immutable, reusable) Firestore reference of a chat document."""
+    return db.collection('users').document(user_id).collection('chats').document(chat_id)
+
 def save_chat_context(user_id, chat_id, project_context):
-    """Save the project context (files) for a specific chat."""
+    """
+    Save the project context (files) for a specific chat.
+    File contents live in a 'files' subcollection keyed by content hash, and only
+    files not written before in this session are sent; the chat document just
+    keeps a {path: hash} map.
+    """
     try:
-        from firebase_utils import db
-        chat_ref = db.collection('users').document(user_id).collection('chats').document(chat_id)
+        chat_ref = _chat_ref(user_id, chat_id)
+        files = project_context.get('files', {})
+        file_hashes = {path: hashlib.sha1(content.encode('utf-8')).hexdigest() for path, content in files.items()}
+        
+        saved_hashes = st.session_state.setdefault('saved_file_hashes', {}).setdefault(chat_id, set())
+        new_files = list({file_hash: path for path, file_hash in file_hashes.items() if file_hash not in saved_hashes}.items())
+        for start in range(0, len(new_files), FIRESTORE_BATCH_SIZE):
+            batch = db.batch()
+            for file_hash, path in new_files[start:start + FIRESTORE_BATCH_SIZE]:
+                batch.set(chat_ref.collection('files').document(file_hash), {'path': path, 'content': files[path]})
+            batch.commit()
+        saved_hashes.update(file_hash for file_hash, _ in new_files)
+        
         chat_ref.update({
-            'project_context': project_context,
+            'project_context': {**project_context, 'files': file_hashes, 'files_in_subcollection': True},
             'has_project_files': project_context.get('indexed', False)
         })
+        invalidate_chat_list()
         return True
     except Exception as e:
         st.error(f"Failed to save chat context: {str(e)}")
         return False
 
+def delete_chat(user_id, chat_id):
+    """
+    Delete a chat together with its 'files' subcollection, which Firestore
+    does not remove with the parent. Deletes go out in write batches, the
+    chat document in the last one.
+    """
+    chat_ref = _chat_ref(user_id, chat_id)
+    refs = list(chat_ref.collection('files').list_documents())
+    refs.append(chat_ref)
+    for start in range(0, len(refs), FIRESTORE_BATCH_SIZE):
+        batch = db.batch()
+        for ref in refs[start:start + FIRESTORE_BATCH_SIZE]:
+            batch.delete(ref)
+        batch.commit()
+    st.session_state.get('saved_file_hashes', {}).pop(chat_id, None)
+    invalidate_chat_list()
+
 def load_chat_context(user_id, chat_id):
     """Load the project context for a specific chat."""
     try:
-        from firebase_utils import db
-        chat_ref = db.collection('users').document(user_id).collection('chats').document(chat_id)
+        chat_ref = _chat_ref(user_id, chat_id)
         chat_doc = chat_ref.get()
         
         if chat_doc.exists:
             data = chat_doc.to_dict()
-            return data.get('project_context', {})
+            project_context = data.get('project_context', {})
+            if project_context.pop('files_in_subcollection', False):
+                # Fetch every file body in one batched round trip
+                file_hashes = project_context.get('files', {})
+                files_ref = chat_ref.collection('files')
+                contents = {
+                    doc.id: doc.to_dict().get('content', '')
+                    for doc in db.get_all([files_ref.document(h) for h in set(file_hashes.values())])
+                    if doc.exists
+                }
+                project_context['files'] = {path: contents[h] for path, h in file_hashes.items() if h in contents}
+                st.session_state.setdefault('saved_file_hashes', {})[chat_id] = set(contents)
+            return project_context
         return {}
     except Exception as e:
         st.warning(f"Could not load chat context: {str(e)}")
@@ -334,15 +641,28 @@ def restore_chat_context(user_id, chat_id):
         if saved_context.get('files'):
             try:
                 if st.session_state.project_rag is None:
-                    st.session_state.project_rag = ProjectRAG()
+                    st.session_state.project_rag = ProjectRAG(quantization=st.session_state.get('rag_quant', 'binary'))
                 
-                # Re-index the files for this chat session
+                # Reuse the saved index (local, then Firebase Storage) before re-embedding
                 chat_specific_project_id = f"chat_{chat_id}"
-                st.session_state.project_rag.index_project_files(
-                    saved_context['files'], 
-                    user_id=user_id, 
-                    project_id=chat_specific_project_id
-                )
+                rag = st.session_state.project_rag
+                restored = rag.load_project(user_id, chat_specific_project_id, mmap=True)
+                if not restored:
+                    try:
+                        restored = (
+                            download_chat_index(user_id, chat_id, rag.store_path(user_id, chat_specific_project_id))
+                            and rag.load_project(user_id, chat_specific_project_id, mmap=True)
+                        )
+                    except Exception:
+                        restored = False
+                
+                if not restored:
+                    # Re-index the files for this chat session
+                    rag.index_project_files(
+                        deduplicate_files(saved_context['files'])[0], 
+                        user_id=user_id, 
+                        project_id=chat_specific_project_id
+                    )
                 
                 st.success(f"🧠 Restored {len(saved_context['files'])} files with RAG for this chat session")
                 return True
@@ -369,9 +689,8 @@ def reset_session_for_new_chat():
     st.session_state.project_rag = None
     
     # Clear file uploader state by removing all uploader keys
-    for key in list(st.session_state.keys()):
-        if isinstance(key, str) and key.startswith('file_uploader_'):
-            del st.session_state[key]
+    for key in [k for k in st.session_state if isinstance(k, str) and k.startswith('file_uploader_')]:
+        del st.session_state[key]
     
     # Clear any file upload state
     if hasattr(st.session_state, 'uploaded_files_temp'):
@@ -382,28 +701,8 @@ def reset_session_for_new_chat():
         st.session_state.show_uploader = False
     
     # Reset project generation state
-    st.session_state.project_generation_state = {
-        "is_generating": False,
-        "current_step": None,
-        "generated_files": [],
-        "project_name": "",
-        "tech_stack": [],
-        "architecture": "",
-        "user_feedback": "",
-        "generation_complete": False,
-        "zip_data": None,
-        # New interactive workflow states
-        "workflow_step": "initial",  # initial, tech_stack_selection, architecture_review, group_generation, complete
-        "requirements": "",
-        "suggested_tech_stack": {},
-        "selected_tech_stack": "",
-        "project_architecture": "",
-        "file_groups": [],
-        "current_group_index": 0,
-        "generated_groups": [],
-        "user_confirmations": {},
-        "project_description": ""
-    }
+    st.session_state.project_generation_state = new_project_generation_state()
+    st.session_state.llm_cache_refresh = False
     st.session_state.project_generation_history = []
 
 def create_project_zip(files_content, project_name="generated_project"):
@@ -414,14 +713,13 @@ def create_project_zip(files_content, project_name="generated_project"):
     try:
         zip_buffer = BytesIO()
         
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        # Level 1 is several times faster than the default 6 and barely larger for source code
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zip_file:
             # Add all project files with proper directory structure
             for file_path, content in files_content.items():
                 try:
-                    # Ensure proper path separators and clean the path
-                    clean_path = file_path.replace('\\', '/').strip()
-                    # Remove any invalid characters
-                    clean_path = re.sub(r'[<>:"|?*]', '_', clean_path)
+                    # Ensure proper path separators, clean the path and replace invalid characters
+                    clean_path = file_path.replace('\\', '/').strip().translate(ZIP_PATH_SANITIZE_TABLE)
                     
                     if clean_path and content:
                         zip_file.writestr(clean_path, content)
@@ -436,50 +734,58 @@ def create_project_zip(files_content, project_name="generated_project"):
                 "total_files": len(files_content),
                 "file_list": list(files_content.keys())
             }
-            zip_file.writestr("PROJECT_METADATA.json", json.dumps(metadata, indent=2))
+            if ORJSON_AVAILABLE:
+                metadata_json = orjson.dumps(metadata, option=orjson.OPT_INDENT_2)
+            else:
+                metadata_json = json.dumps(metadata, indent=2)
+            zip_file.writestr("PROJECT_METADATA.json", metadata_json)
         
-        zip_buffer.seek(0)
-        return zip_buffer.read()
+        return zip_buffer.getvalue()
     except Exception as e:
         st.error(f"❌ Error creating ZIP file: {str(e)}")
         return None
 
+# Formats the models use to label generated files, in order of preference.
+# Each pattern captures (file path, file content).
+FILE_BLOCK_PATTERNS = [
+    # Pattern 1: **filename.ext** [whitespace] ```[lang]\n...```
+    r'\*\*([^*]+)\*\*\s*```[a-zA-Z0-9]*\n(.*?)```',
+    # Pattern 2: 📄 **filename.ext** [whitespace] ```[lang]\n...```
+    r'📄\s*\*\*([^*]+)\*\*\s*```[a-zA-Z0-9]*\n(.*?)```',
+    # Pattern 3: **filename.ext** followed by code block
+    r'\*\*([^*]+)\*\*\s*\n\s*```[a-zA-Z0-9]*\n(.*?)```',
+    # Pattern 4: filename.ext in code block with comment
+    r'```[a-zA-Z0-9]*\s*#\s*([^\n]+)\n(.*?)```',
+    # Pattern 5: filename.ext with ```lang\n...```
+    r'([^\s]+\.(?:py|js|ts|html|css|json|md|txt|yml|yaml|sh|dockerfile|env|gitignore|sql|java|cpp|c|php|rb|go|rs|swift|kt|scala))\s*```[a-zA-Z0-9]*\n(.*?)```',
+    # Pattern 6: filename.ext with ```\n...```
+    r'([^\s]+\.(?:py|js|ts|html|css|json|md|txt|yml|yaml|sh|dockerfile|env|gitignore|sql|java|cpp|c|php|rb|go|rs|swift|kt|scala))\s*```\n(.*?)```'
+]
+# All patterns as one alternation so the response is scanned once. Every
+# alternative is wrapped in a group, so its path and content are the next two groups.
+_FILE_BLOCK_RE = re.compile("|".join(f"({pattern})" for pattern in FILE_BLOCK_PATTERNS), re.DOTALL)
+_PATH_TRIM_RE = re.compile(r'^[^\w./-]+|[^\w./-]+$')
+_CODE_BLOCK_RE = re.compile(r'```[a-zA-Z0-9]*\n(.*?)```', re.DOTALL)
+
 def extract_project_files_from_response(response_text):
     """Extract project files from AI response text."""
     files = {}
-    import re
     
     # Check if response is empty
     if not response_text or len(response_text.strip()) < 10:
         return files
     
-    # Multiple patterns to handle different formats
-    patterns = [
-        # Pattern 1: **filename.ext** [whitespace] ```[lang]\n...```
-        r'\*\*([^*]+)\*\*\s*```[a-zA-Z0-9]*\n(.*?)```',
-        # Pattern 2: 📄 **filename.ext** [whitespace] ```[lang]\n...```
-        r'📄\s*\*\*([^*]+)\*\*\s*```[a-zA-Z0-9]*\n(.*?)```',
-        # Pattern 3: **filename.ext** followed by code block
-        r'\*\*([^*]+)\*\*\s*\n\s*```[a-zA-Z0-9]*\n(.*?)```',
-        # Pattern 4: filename.ext in code block with comment
-        r'```[a-zA-Z0-9]*\s*#\s*([^\n]+)\n(.*?)```',
-        # Pattern 5: filename.ext with ```lang\n...```
-        r'([^\s]+\.(?:py|js|ts|html|css|json|md|txt|yml|yaml|sh|dockerfile|env|gitignore|sql|java|cpp|c|php|rb|go|rs|swift|kt|scala))\s*```[a-zA-Z0-9]*\n(.*?)```',
-        # Pattern 6: filename.ext with ```\n...```
-        r'([^\s]+\.(?:py|js|ts|html|css|json|md|txt|yml|yaml|sh|dockerfile|env|gitignore|sql|java|cpp|c|php|rb|go|rs|swift|kt|scala))\s*```\n(.*?)```'
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, response_text, re.DOTALL)
-        for file_path, content in matches:
-            if file_path and content:
-                # Clean up file path
-                clean_path = file_path.strip()
-                # Remove any leading/trailing punctuation and quotes
-                clean_path = re.sub(r'^[^\w./-]+|[^\w./-]+$', '', clean_path)
-                clean_path = clean_path.strip('"\'`')
-                if clean_path and len(clean_path) > 1:
-                    files[clean_path] = content.strip()
+    for match in _FILE_BLOCK_RE.finditer(response_text):
+        file_path = match.group(match.lastindex + 1)
+        content = match.group(match.lastindex + 2)
+        if file_path and content:
+            # Clean up file path
+            clean_path = file_path.strip()
+            # Remove any leading/trailing punctuation and quotes
+            clean_path = _PATH_TRIM_RE.sub('', clean_path)
+            clean_path = clean_path.strip('"\'`')
+            if clean_path and len(clean_path) > 1:
+                files[clean_path] = content.strip()
     
     # Remove duplicates (keep the last occurrence)
     unique_files = {}
@@ -489,7 +795,7 @@ def extract_project_files_from_response(response_text):
     # Debug: If no files found, try to identify why
     if not unique_files and len(response_text) > 50:
         # Look for any code blocks that might contain files
-        code_blocks = re.findall(r'```[a-zA-Z0-9]*\n(.*?)```', response_text, re.DOTALL)
+        code_blocks = _CODE_BLOCK_RE.findall(response_text)
         if code_blocks:
             # Create generic files from code blocks
             for i, code_block in enumerate(code_blocks):
@@ -507,11 +813,9 @@ def extract_project_files_from_response(response_text):
     
     return unique_files
 
-def generate_comprehensive_project_prompt(prompt, context_info, is_followup=False):
-    """Generate a comprehensive prompt for complete project generation."""
-    
-    if is_followup:
-        return f"""
+# Static prompt bodies for generate_comprehensive_project_prompt; only
+# {prompt} and {context_info} are filled in per call.
+FOLLOWUP_PROJECT_PROMPT_TEMPLATE = """
 You are a SENIOR FULL-STACK DEVELOPER with 15+ years of experience building enterprise-scale applications.
 
 **PREVIOUS CONTEXT:**
@@ -554,8 +858,8 @@ For each file, use this exact format:
 
 **CURRENT REQUEST:** {prompt}
 """
-    else:
-        return f"""
+
+INITIAL_PROJECT_PROMPT_TEMPLATE = """
 You are a SENIOR FULL-STACK DEVELOPER with 15+ years of experience building enterprise-scale applications.
 
 **PROJECT REQUIREMENTS:**
@@ -652,6 +956,11 @@ For each file, use EXACTLY this format:
 **GENERATE A SOPHISTICATED, ENTERPRISE-GRADE, PRODUCTION-READY PROJECT WITH ALL FILES.**
 """
 
+def generate_comprehensive_project_prompt(prompt, context_info, is_followup=False):
+    """Generate a comprehensive prompt for complete project generation."""
+    template = FOLLOWUP_PROJECT_PROMPT_TEMPLATE if is_followup else INITIAL_PROJECT_PROMPT_TEMPLATE
+    return template.format_map({'prompt': prompt, 'context_info': context_info})
+
 def fetch_git_repository(repo_url):
     """Fetch repository files from Git URL"""
     try:
@@ -727,26 +1036,256 @@ def _create_agent_specific_project_prompt(action_type, prompt, selected_agent, r
     
     return prompt
 
-def generate_agent_response(prompt, agent_type, model_name, rag_context=None, files_context=None):
-    """Generate response using selected agent type with RAG context."""
+def _call_llm(prompt, model_name):
+    """Send a single prompt to the selected provider."""
+    messages = [{"role": "user", "content": prompt}]
+    if model_name.startswith("gemini"):
+        return generate_gemini_response(messages, model_name=model_name)
+    return generate_openai_response(messages, model_name=model_name)
+
+def _stream_llm(prompt, model_name):
+    """Stream a single prompt's response from the selected provider."""
+    messages = [{"role": "user", "content": prompt}]
+    if model_name.startswith("gemini"):
+        return stream_gemini_response(messages, model_name=model_name)
+    return stream_openai_response(messages, model_name=model_name)
+
+# Placeholder for the user's text in agent prompt templates (see cached_generate)
+_QUERY_SLOT = "\0QUERY\0"
+
+def _get_cache_encoder():
+    """Return the shared sentence-transformer used by the RAG index, if available."""
+    if not RAG_AVAILABLE:
+        return None
+    try:
+        return get_embedding_model()
+    except Exception:
+        return None
+
+def _response_cache_slot(prompt, model_name, query=None, query_template=None):
+    """
+    Return (cached response or None, function that stores a fresh response).
+    While ``st.session_state.llm_cache_refresh`` is set (after "Regenerate
+    Project") lookups always miss, but fresh responses still replace old ones.
+    """
+    refresh = st.session_state.get("llm_cache_refresh", False)
+    encoder = _get_cache_encoder() if query and query_template is not None else None
+    if encoder is None:
+        key = cache_key(model_name, prompt)
+        exact_cache = st.session_state.setdefault("llm_cache", {})
+        # Same layout as the command-line pipeline, so reruns, new sessions and
+        # the CLI all reuse each other's answers
+        cache_path = os.path.join(CACHE_DIR, "llm", key[:2], f"{key}.txt")
+        if key not in exact_cache and not refresh:
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    exact_cache[key] = f.read()
+            except OSError:
+                pass
+        
+        def store(response):
+            exact_cache[key] = response
+            try:
+                atomic_write_bytes(cache_path, response.encode("utf-8"))
+            except OSError:
+                pass
+        
+        return (None if refresh else exact_cache.get(key)), store
+    
+    # Semantic hits are only shared between identical templates of one user
+    user = st.session_state.get("user")
+    namespace = cache_key(model_name, get_user_id(user) if user else "", query_template)
+    vector = encoder.encode([query], normalize_embeddings=True)[0]
+    caches = st.session_state.setdefault("sem_cache", {})
+    cache_path = os.path.join(CACHE_DIR, "semantic", "chat", f"{namespace}.pkl")
+    if namespace not in caches:
+        # Answers persist across sessions, shared with the command-line cache dir
+        loaded = SemanticCache.load(cache_path)
+        if loaded is not None and loaded.planes.shape[-1] != len(vector):
+            loaded = None  # saved with a different embedding model
+        caches[namespace] = loaded
+    cache = caches[namespace]
+    
+    def store(response):
+        if caches.get(namespace) is None:
+            caches[namespace] = SemanticCache(len(vector), threshold=SEMANTIC_CACHE_THRESHOLD,
+                                              ttl=SEMANTIC_CACHE_TTL)
+        caches[namespace].put(vector, response)
+        try:
+            caches[namespace].save(cache_path)
+        except OSError:
+            pass
+    
+    return (cache.get(vector) if cache is not None and not refresh else None), store
+
+def cached_generate(prompt, model_name, query=None, query_template=None):
+    """
+    Generate a response for ``prompt``, reusing earlier answers where possible.
+
+    ``query`` is the user's own text inside ``prompt`` and ``query_template``
+    is ``prompt`` with ``_QUERY_SLOT`` in its place. The template must match
+    exactly (per user), while the query is compared by embedding, so a
+    near-identical follow-up is answered from ``st.session_state['sem_cache']``
+    (saved under ``CACHE_DIR`` so it outlives the session) instead of another
+    LLM round trip. Without a query only identical prompts are reused, from
+    ``st.session_state['llm_cache']`` or ``CACHE_DIR/llm``. Error responses
+    are never cached.
+    """
+    cached, store = _response_cache_slot(prompt, model_name, query, query_template)
+    if cached is not None:
+        return cached
+    response = _call_llm(prompt, model_name)
+    if response and not is_error_response(response):
+        store(response)
+    return response
+
+def _record_stream(stream, parts):
+    """Yield from ``stream``, appending each piece to ``parts``; return the stream's return value."""
+    while True:
+        try:
+            part = next(stream)
+        except StopIteration as stop:
+            return stop.value
+        parts.append(part)
+        yield part
+
+def cached_generate_stream(prompt, model_name, query=None, query_template=None):
+    """
+    Like cached_generate, but yields the response in pieces as the model produces it.
+    The stream helpers return True when they yielded an error message, possibly
+    after partial output; such a reply is shown but never cached.
+    """
+    cached, store = _response_cache_slot(prompt, model_name, query, query_template)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    failed = yield from _record_stream(_stream_llm(prompt, model_name), parts)
+    response = "".join(parts)
+    if response and not failed and not is_error_response(response):
+        store(response)
+
+def _truncate(text, limit):
+    """Return ``text`` cut to ``limit`` characters, with "..." marking a cut."""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def project_files_hash(project_context):
+    """Return (and remember) a fingerprint of the project's uploaded files."""
+    files_hash = project_context.get('files_hash')
+    if files_hash is None:
+        files = project_context.get('files', {})
+        files_hash = project_context['files_hash'] = cache_key(
+            *(part for path in sorted(files) for part in (path, files[path])))
+    return files_hash
+
+@functools.lru_cache(maxsize=32)
+def build_project_files_context(files_hash, doc_limit):
+    """
+    Build the uploaded-files block of the agent prompt.
+
+    The result only depends on the files identified by ``files_hash`` (which
+    must belong to the current project context), so it is assembled once per
+    upload rather than on every chat turn. Requirements documents are cut at
+    ``doc_limit`` characters, code files at 2000.
+    """
+    files_dict = st.session_state.project_context.get('files', {})
+    # Write straight into one buffer rather than building a list of file blocks
+    buf = StringIO()
+    buf.write("\n🔍 **UPLOADED PROJECT FILES**:\n\n")
+    for i, (filename, content) in enumerate(files_dict.items()):
+        if is_doc_file(filename):
+            limit = doc_limit
+        else:
+            limit = 2000
+        if i:
+            buf.write("\n\n---\n\n")
+        buf.write(f"📄 **{filename}**:\n```\n")
+        buf.write(_truncate(content, limit))
+        buf.write("\n```")
+    buf.write("\n")
+    return buf.getvalue()
+
+def has_assistant_reply():
+    """
+    Return True if the current chat history contains an assistant message.
+    History is only ever appended to or replaced wholesale, so the scan resumes
+    where the previous call stopped for as long as the same list is in use.
+    """
+    history = st.session_state.chat_history
+    scanned_list, scanned, found = st.session_state.get("_assistant_scan", (None, 0, False))
+    if scanned_list is not history or scanned > len(history):
+        scanned, found = 0, False
+    if not found:
+        found = any(msg.get("role") == "assistant" for msg in islice(history, scanned, None))
+    st.session_state["_assistant_scan"] = (history, len(history), found)
+    return found
+
+def chat_history_markdown():
+    """
+    Return the current chat history as markdown for the download button.
+    Like has_assistant_reply, only messages appended since the last call are
+    rendered while the same history list is in use.
+    """
+    history = st.session_state.chat_history
+    built_list, built, chat_md = st.session_state.get("_chat_md", (None, 0, ""))
+    if built_list is not history or built > len(history):
+        built, chat_md = 0, ""
+    if built < len(history):
+        chat_md += "".join(
+            f"\n**{msg.get('role', 'user').capitalize()}:**\n\n{msg.get('content', '')}\n\n"
+            for msg in islice(history, built, None)
+        )
+    st.session_state["_chat_md"] = (history, len(history), chat_md)
+    return chat_md
+
+def _split_mermaid(content):
+    """Return (stripped mermaid diagram sources, remaining markdown) for a message."""
+    if '```mermaid' not in content:
+        return (), content
+    blocks = tuple(block.strip() for block in _MERMAID_BLOCK_RE.findall(content))
+    return blocks, _MERMAID_BLOCK_RE.sub('', content).strip()
+
+def rendered_chat_history():
+    """
+    Return (message, mermaid blocks, markdown) for each chat history message.
+    Like has_assistant_reply, only messages appended since the last call are
+    split while the same history list is in use.
+    """
+    history = st.session_state.chat_history
+    split_list, split_count, rendered = st.session_state.get("_rendered_history", (None, 0, []))
+    if split_list is not history or split_count > len(history):
+        split_count, rendered = 0, []
+    if split_count < len(history):
+        rendered = rendered + [(msg, *_split_mermaid(msg["content"])) for msg in islice(history, split_count, None)]
+    st.session_state["_rendered_history"] = (history, len(history), rendered)
+    return rendered
+
+def generate_agent_response(prompt, agent_type, model_name, rag_context=None, files_context=None, stream=False):
+    """
+    Generate response using selected agent type with RAG context.
+    With stream=True an iterator of text pieces is returned (for st.write_stream).
+    """
     
     # Build enhanced prompt based on agent type and available context
     context_info = ""
     
     # Detect simple requests early to avoid loading large context
     if agent_type == "🚀 Project Generator":
-        simple_keywords = ["hi", "hello", "thanks", "thank you", "ok", "okay", "good", "great"]
+        prompt_lower = prompt.lower()
         # Exclude systematic generation keywords from simple request detection
-        systematic_keywords = ["option", "stack", "group", "continue", "generate", "django", "fastapi", "flask", "react", "1", "2", "3"]
-        has_systematic_keyword = any(keyword in prompt.lower() for keyword in systematic_keywords)
+        has_systematic_keyword = any(keyword in prompt_lower for keyword in SYSTEMATIC_KEYWORDS)
         
         is_simple_request = (
             not has_systematic_keyword and (
                 len(prompt.split()) <= 2 or 
-                any(prompt.lower().strip() in [word, word + "!", word + "."] for word in simple_keywords) or
-                (len(prompt) < 15 and not any(char.isdigit() for char in prompt))
+                prompt_lower.strip() in SIMPLE_REQUESTS or
+                (len(prompt) < 15 and not _DIGIT_RE.search(prompt))
             )
         )
+        # Bare greetings and acknowledgements don't need a model round trip
+        canned_reply = CANNED_REPLIES.get(prompt_lower.strip(' !.')) if is_simple_request else None
+        if canned_reply:
+            return iter([canned_reply]) if stream else canned_reply
     else:
         is_simple_request = False
 
@@ -755,22 +1294,9 @@ def generate_agent_response(prompt, agent_type, model_name, rag_context=None, fi
         # Include complete project files context for all agents
         files_dict = st.session_state.project_context.get('files', {})
         if files_dict:
-            project_files = []
-            for filename, content in files_dict.items():
-                # For Project Generator, include much more content from requirements documents
-                if agent_type == "🚀 Project Generator":
-                    # Include full content for requirements documents (Word docs, PDFs, etc.)
-                    if any(ext in filename.lower() for ext in ['.docx', '.doc', '.pdf', '.txt', '.md']):
-                        # Keep full content for requirements documents
-                        truncated_content = content[:8000] + "..." if len(content) > 8000 else content
-                    else:
-                        # Regular truncation for code files
-                        truncated_content = content[:2000] + "..." if len(content) > 2000 else content
-                else:
-                    # Regular truncation for other agents
-                    truncated_content = content[:2000] + "..." if len(content) > 2000 else content
-                project_files.append(f"📄 **{filename}**:\n```\n{truncated_content}\n```")
-            context_info = f"\n🔍 **UPLOADED PROJECT FILES**:\n\n" + "\n\n---\n\n".join(project_files) + "\n"
+            # For Project Generator, include much more content from requirements documents
+            doc_limit = 8000 if agent_type == "🚀 Project Generator" else 2000
+            context_info = build_project_files_context(project_files_hash(st.session_state.project_context), doc_limit)
         elif rag_context:
             # Only fallback to RAG if no direct files available
             context_files = "\n".join([f"File: {result['file']}\nContent: {result['content'][:800]}..." 
@@ -787,13 +1313,10 @@ def generate_agent_response(prompt, agent_type, model_name, rag_context=None, fi
     
     if agent_type == "🚀 Project Generator":
         # Check if this is a follow-up conversation or fresh project request
-        is_followup = len(st.session_state.chat_history) > 1 and any(
-            msg.get("role") == "assistant" for msg in st.session_state.chat_history
-        )
+        is_followup = len(st.session_state.chat_history) > 1 and has_assistant_reply()
         
         # Detect follow-up keywords
-        followup_keywords = ["fix", "add", "modify", "change", "update", "improve", "explain", "how", "why", "error", "issue", "problem", "help"]
-        is_followup_request = any(keyword in prompt.lower() for keyword in followup_keywords)
+        is_followup_request = _FOLLOWUP_RE.search(prompt) is not None
         
         # Use interactive workflow for Project Generator
         if not is_simple_request:
@@ -806,7 +1329,7 @@ You are a senior software architect starting a new project generation workflow.
 **PROJECT REQUIREMENTS:**
 {context_info}
 
-**USER REQUEST:** {prompt}
+**USER REQUEST:** {_QUERY_SLOT}
 
 **WORKFLOW INITIATION:**
 I'm starting the interactive project generation process. Here's what will happen:
@@ -823,13 +1346,13 @@ Let me start by analyzing your requirements and suggesting appropriate technolog
 """
             else:
                 # Continue with existing workflow or handle follow-up requests
-                context_prompt = generate_comprehensive_project_prompt(prompt, context_info, is_followup and is_followup_request)
+                context_prompt = generate_comprehensive_project_prompt(_QUERY_SLOT, context_info, is_followup and is_followup_request)
         else:
             # Light prompt for simple requests like greetings
             context_prompt = f"""
 You are a helpful senior developer assistant. 
 
-**SIMPLE REQUEST:** {prompt}
+**SIMPLE REQUEST:** {_QUERY_SLOT}
 
 **CONTEXT:** We're working on a project together. Respond naturally and helpfully to this simple request.
 
@@ -840,13 +1363,13 @@ You are a helpful senior developer assistant.
 - Reference our ongoing work if relevant
 - Use emojis and visual elements when appropriate
 
-**RESPOND TO:** {prompt}
+**RESPOND TO:** {_QUERY_SLOT}
 """
     
     elif agent_type == "🔍 Project Analyzer":
         if st.session_state.project_context.get('indexed'):
             context_prompt = f"""
-You are a Senior Technical Lead providing project onboarding. Analyze the uploaded project: {prompt}
+You are a Senior Technical Lead providing project onboarding. Analyze the uploaded project: {_QUERY_SLOT}
 
 {context_info}
 
@@ -877,7 +1400,7 @@ Base analysis on the ACTUAL uploaded project files. Be thorough yet accessible f
 """
         else:
             context_prompt = f"""
-You are a Senior Technical Lead. Analyze this project concept: {prompt}
+You are a Senior Technical Lead. Analyze this project concept: {_QUERY_SLOT}
 
 {context_info}
 
@@ -894,7 +1417,7 @@ Provide general project planning guidance:
     elif agent_type == "🛠️ Code Assistant":
         if st.session_state.project_context.get('indexed'):
             context_prompt = f"""
-You are an Expert Developer Assistant working on an existing project. Task: {prompt}
+You are an Expert Developer Assistant working on an existing project. Task: {_QUERY_SLOT}
 
 {context_info}
 
@@ -923,11 +1446,11 @@ CODE REQUIREMENTS:
 - Include proper error handling and logging consistent with existing code
 - Add appropriate tests following existing test patterns
 
-Request: {prompt}
+Request: {_QUERY_SLOT}
 """
         else:
             context_prompt = f"""
-You are an Expert Developer Assistant. Task: {prompt}
+You are an Expert Developer Assistant. Task: {_QUERY_SLOT}
 
 {context_info}
 
@@ -950,19 +1473,21 @@ Provide actionable feedback and best practices.
     
     
     else:
-        context_prompt = f"{context_info}\n{prompt}"
+        context_prompt = f"{context_info}\n{_QUERY_SLOT}"
+    
+    # The prompts above hold _QUERY_SLOT where the user's text goes; the
+    # unfilled template keys the semantic cache, so the same words elsewhere
+    # in the prompt (file contents, RAG snippets) don't matter
+    query_template = context_prompt
+    context_prompt = query_template.replace(_QUERY_SLOT, prompt)
     
     # Generate response based on model
-    if model_name.startswith("gemini"):
-        return generate_gemini_response([{"role": "user", "content": context_prompt}], model_name=model_name)
-    elif model_name.startswith("openai"):
-        return generate_openai_response([{"role": "user", "content": context_prompt}], model_name=model_name)
-    else:
-        return generate_openai_response([{"role": "user", "content": context_prompt}], model_name=model_name)
+    if stream:
+        return cached_generate_stream(context_prompt, model_name, query=prompt, query_template=query_template)
+    return cached_generate(context_prompt, model_name, query=prompt, query_template=query_template)
 
-def analyze_requirements_and_suggest_tech_stack(prompt, context_info):
-    """Analyze requirements and suggest appropriate tech stack."""
-    analysis_prompt = f"""
+# Prompt body for analyze_requirements_and_suggest_tech_stack, filled with format_map
+TECH_STACK_ANALYSIS_PROMPT_TEMPLATE = """
 You are a senior software architect analyzing project requirements.
 
 **PROJECT REQUIREMENTS:**
@@ -1002,13 +1527,15 @@ RECOMMENDATION: [Which option is best and why]
 
 Provide concise, focused recommendations.
 """
+
+def analyze_requirements_and_suggest_tech_stack(prompt, context_info):
+    """Analyze requirements and suggest appropriate tech stack."""
+    analysis_prompt = TECH_STACK_ANALYSIS_PROMPT_TEMPLATE.format_map(
+        {'context_info': context_info, 'prompt': prompt})
     
     # Generate analysis using the current model
     selected_model = st.session_state.get("selected_model", "gemini-2.5-pro")
-    if selected_model.startswith("gemini"):
-        return generate_gemini_response([{"role": "user", "content": analysis_prompt}], model_name=selected_model)
-    else:
-        return generate_openai_response([{"role": "user", "content": analysis_prompt}], model_name=selected_model)
+    return cached_generate(analysis_prompt, selected_model)
 
 def parse_tech_stack_options(analysis_text):
     """Extract each 'Option N:' block from the analysis text."""
@@ -1029,9 +1556,8 @@ def parse_tech_stack_options(analysis_text):
 
     return options
 
-def validate_custom_tech_stack(custom_tech_stack, requirements):
-    """Validate if the custom tech stack is feasible for the requirements."""
-    validation_prompt = f"""
+# Prompt body for validate_custom_tech_stack, filled with format_map
+TECH_STACK_VALIDATION_PROMPT_TEMPLATE = """
 You are a senior software architect validating a custom tech stack.
 
 **PROJECT REQUIREMENTS:**
@@ -1075,19 +1601,17 @@ ALTERNATIVE SUGGESTIONS:
 
 Provide honest, thorough evaluation with specific recommendations.
 """
+
+def validate_custom_tech_stack(custom_tech_stack, requirements):
+    """Validate if the custom tech stack is feasible for the requirements."""
+    validation_prompt = TECH_STACK_VALIDATION_PROMPT_TEMPLATE.format_map(
+        {'requirements': requirements, 'custom_tech_stack': custom_tech_stack})
     
     selected_model = st.session_state.get("selected_model", "gemini-2.5-pro")
-    if selected_model.startswith("gemini"):
-        return generate_gemini_response([{"role": "user", "content": validation_prompt}], model_name=selected_model)
-    else:
-        return generate_openai_response([{"role": "user", "content": validation_prompt}], model_name=selected_model)
+    return cached_generate(validation_prompt, selected_model)
 
-def generate_project_architecture(requirements, tech_stack):
-    """Generate detailed project architecture and file structure."""
-    # Truncate requirements to avoid large requests
-    truncated_requirements = requirements[:1000] + "..." if len(requirements) > 1000 else requirements
-    
-    architecture_prompt = f"""
+# Prompt body for generate_project_architecture, filled with format_map
+ARCHITECTURE_PROMPT_TEMPLATE = """
 You are a SENIOR SOFTWARE ARCHITECT with 15+ years of experience designing enterprise-scale applications.
 
 **PROJECT REQUIREMENTS:**
@@ -1208,30 +1732,20 @@ SETUP INSTRUCTIONS:
 
 **IMPORTANT:** Design the architecture based on the ACTUAL complexity of the requirements. If this is a simple CRUD app, keep it simple. If it's a complex enterprise system, design accordingly with proper layers, security, and scalability.
 """
-    
-    selected_model = st.session_state.get("selected_model", "gemini-2.5-pro")
-    if selected_model.startswith("gemini"):
-        return generate_gemini_response([{"role": "user", "content": architecture_prompt}], model_name=selected_model)
-    else:
-        return generate_openai_response([{"role": "user", "content": architecture_prompt}], model_name=selected_model)
 
-def generate_file_group(group_name, file_list, requirements, tech_stack, architecture, previous_groups=None):
-    """Generate a specific group of files with complete, working code."""
-    
+def generate_project_architecture(requirements, tech_stack):
+    """Generate detailed project architecture and file structure."""
     # Truncate requirements to avoid large requests
-    truncated_requirements = requirements[:800] + "..." if len(requirements) > 800 else requirements
-    truncated_architecture = architecture[:1000] + "..." if len(architecture) > 1000 else architecture
+    truncated_requirements = _truncate(requirements, 1000)
     
-    # Build minimal context from previous groups
-    previous_context = ""
-    if previous_groups:
-        previous_context = "\n\nPREVIOUSLY GENERATED FILES:\n"
-        for group in previous_groups:
-            previous_context += f"\n{group['name']}:\n"
-            for file_path in list(group['files'].keys())[:5]:  # Limit to 5 files
-                previous_context += f"- {file_path}\n"
+    architecture_prompt = ARCHITECTURE_PROMPT_TEMPLATE.format_map(
+        {'truncated_requirements': truncated_requirements, 'tech_stack': tech_stack})
     
-    group_prompt = f"""
+    selected_model = st.session_state.get("selected_model", "gemini-2.5-pro")
+    return cached_generate(architecture_prompt, selected_model)
+
+# Prompt body for build_file_group_prompt, filled with format_map
+FILE_GROUP_PROMPT_TEMPLATE = """
 You are a SENIOR FULL-STACK DEVELOPER with 10+ years of experience building enterprise-scale applications.
 
 **PROJECT REQUIREMENTS:**
@@ -1242,7 +1756,7 @@ You are a SENIOR FULL-STACK DEVELOPER with 10+ years of experience building ente
 
 **CURRENT GROUP:** {group_name}
 **FILES TO GENERATE:**
-{chr(10).join(f"- {file}" for file in file_list[:10])}
+{files_to_generate}
 
 {previous_context}
 
@@ -1344,72 +1858,138 @@ For each file, use EXACTLY this format:
 
 Generate ALL files in this group with sophisticated, enterprise-grade, production-ready code that can be immediately executed and deployed.
 """
+
+def build_file_group_prompt(group_name, file_list, requirements, tech_stack, architecture, previous_groups=None):
+    """Build the prompt used to generate a specific group of files."""
     
-    selected_model = st.session_state.get("selected_model", "gemini-2.5-pro")
-    if selected_model.startswith("gemini"):
-        return generate_gemini_response([{"role": "user", "content": group_prompt}], model_name=selected_model)
-    else:
-        return generate_openai_response([{"role": "user", "content": group_prompt}], model_name=selected_model)
+    # Truncate requirements to avoid large requests
+    truncated_requirements = _truncate(requirements, 800)
+    truncated_architecture = _truncate(architecture, 1000)
+    
+    # Build minimal context from previous groups
+    previous_context = ""
+    if previous_groups:
+        buf = StringIO()
+        buf.write("\n\nPREVIOUSLY GENERATED FILES:\n")
+        for group in previous_groups:
+            buf.write(f"\n{group['name']}:\n")
+            for file_path in islice(group['files'], 5):  # Limit to 5 files
+                buf.write(f"- {file_path}\n")
+        previous_context = buf.getvalue()
+    files_to_generate = "\n".join(f"- {file}" for file in islice(file_list, 10))
+    
+    group_prompt = FILE_GROUP_PROMPT_TEMPLATE.format_map({
+        'truncated_requirements': truncated_requirements,
+        'tech_stack': tech_stack,
+        'group_name': group_name,
+        'files_to_generate': files_to_generate,
+        'previous_context': previous_context,
+    })
+    return group_prompt
+
+def generate_file_group(group_name, file_list, requirements, tech_stack, architecture, previous_groups=None, model_name=None):
+    """Generate a specific group of files with complete, working code."""
+    group_prompt = build_file_group_prompt(group_name, file_list, requirements, tech_stack, architecture, previous_groups)
+    
+    selected_model = model_name or st.session_state.get("selected_model", "gemini-2.5-pro")
+    return cached_generate(group_prompt, selected_model)
+
+def is_independent_file_group(group):
+    """Return True if a group can be generated without the real output of earlier groups."""
+    name = group['name'].lower()
+    return not any(keyword in name for keyword in SEQUENTIAL_GROUP_KEYWORDS)
+
+async def _agenerate(prompt, model_name):
+    """Send a single prompt to the selected provider using its async client."""
+    messages = [{"role": "user", "content": prompt}]
+    if model_name.startswith("gemini"):
+        return await generate_gemini_response_async(messages, model_name=model_name)
+    return await generate_openai_response_async(messages, model_name=model_name)
+
+async def _agenerate_all(prompts, model_name):
+    """Run prompts concurrently, at most FILE_GROUP_CONCURRENCY at a time."""
+    semaphore = asyncio.Semaphore(FILE_GROUP_CONCURRENCY)
+    
+    async def bounded(prompt):
+        async with semaphore:
+            return await _agenerate(prompt, model_name)
+    
+    return await asyncio.gather(*(bounded(prompt) for prompt in prompts), return_exceptions=True)
+
+def prefetch_file_groups(file_groups, requirements, tech_stack, architecture, model_name):
+    """
+    Generate every independent file group concurrently.
+    Earlier groups are described by their planned file lists, so the prompts
+    don't have to wait on each other. Returns {group_index: response}.
+    """
+    indexes = [i for i, group in enumerate(file_groups) if i == 0 or is_independent_file_group(group)]
+    responses = {}
+    pending = []  # (group index, prompt, cache store)
+    for i in indexes:
+        planned = [{'name': g['name'], 'files': dict.fromkeys(g['files'])} for g in file_groups[:i]]
+        prompt = build_file_group_prompt(
+            file_groups[i]['name'], file_groups[i]['files'],
+            requirements, tech_stack, architecture, planned or None
+        )
+        # Re-runs of the same architecture reuse the responses cached by earlier runs;
+        # an error cached before it was recognised is a miss
+        cached, store = _response_cache_slot(prompt, model_name)
+        if cached is not None and not is_error_response(cached):
+            responses[i] = cached
+        else:
+            pending.append((i, prompt, store))
+    
+    if pending:
+        # Streamlit already owns an event loop in the script thread, so run ours in a dedicated one
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = executor.submit(
+                asyncio.run, _agenerate_all([prompt for _, prompt, _ in pending], model_name)
+            ).result()
+        
+        # Failed calls are left out so the group falls back to a sequential request
+        for (i, _, store), result in zip(pending, results):
+            if isinstance(result, str) and result and not is_error_response(result):
+                store(result)
+                responses[i] = result
+    return responses
+
+# "Group N: name" headings followed by their file list
+_GROUPS_RE = re.compile(r'Group \d+:\s*([^\n]+?)\s*\n(.*?)(?=\n\s*Group \d+|$)', re.DOTALL)
+# Fallback headings such as "Backend Files:" or "Configuration:"
+_ALT_GROUPS_RE = re.compile(
+    r'([A-Za-z\s&]+Files?|Configuration|Setup|Documentation|Tests?|Deployment)\s*:\s*\n(.*?)'
+    r'(?=\n\s*(?:[A-Za-z\s&]+Files?|Configuration|Setup|Documentation|Tests?|Deployment)\s*:|$)',
+    re.DOTALL,
+)
+
+def _parse_group_files(files_text):
+    """Return the file paths listed (with or without leading dashes) in ``files_text``."""
+    lines = (line.strip() for line in files_text.splitlines())
+    files = (line[1:].strip() if line.startswith('-') else line for line in lines)
+    return [line for line in files if line]
 
 def parse_file_groups_from_architecture(architecture_response):
     """Parse file groups from the architecture response."""
-    import re
-    
     # Check if response is empty or too short
     if not architecture_response or len(architecture_response.strip()) < 50:
         return []
     
-    # Look for group sections allowing file lists with or without leading dashes
-    groups_pattern = r'Group \d+:\s*([^\n]+?)\s*\n(.*?)(?=\n\s*Group \d+|$)'
-    matches = re.findall(groups_pattern, architecture_response, re.DOTALL)
-    
-    file_groups = []
-    for group_name, files_text in matches:
-        # Extract file paths from the list
-        files = []
-        for line in files_text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('-'):
-                line = line[1:].strip()
-            if line:
-                files.append(line)
-        
-        if files:
-            file_groups.append({
-                'name': group_name.strip(),
-                'files': files
-            })
-    
-    # If no groups found, try alternative pattern
-    if not file_groups:
-        # Look for any pattern that might contain file groups
-        alt_pattern = r'([A-Za-z\s&]+Files?|Configuration|Setup|Documentation|Tests?|Deployment)\s*:\s*\n(.*?)(?=\n\s*(?:[A-Za-z\s&]+Files?|Configuration|Setup|Documentation|Tests?|Deployment)\s*:|$)'
-        alt_matches = re.findall(alt_pattern, architecture_response, re.DOTALL)
-        
-        for group_name, files_text in alt_matches:
-            files = []
-            for line in files_text.splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                if line.startswith('-'):
-                    line = line[1:].strip()
-                if line:
-                    files.append(line)
-            
+    # Look for group sections allowing file lists with or without leading dashes,
+    # then for any other headings that might contain file groups
+    for pattern in (_GROUPS_RE, _ALT_GROUPS_RE):
+        file_groups = []
+        for group_name, files_text in pattern.findall(architecture_response):
+            files = _parse_group_files(files_text)
             if files:
                 file_groups.append({
                     'name': group_name.strip(),
                     'files': files
                 })
+        if file_groups:
+            return file_groups
     
     # If still no groups found, create default groups based on tech stack
-    if not file_groups:
-        file_groups = create_default_file_groups()
-    
-    return file_groups
+    return create_default_file_groups()
 
 def create_default_file_groups():
     """Create default file groups when parsing fails."""
@@ -1453,49 +2033,46 @@ def create_default_file_groups():
         }
     ]
 
+# Map common extensions to language identifiers
+_EXT_MAP = {
+    'py': 'python',
+    'js': 'javascript',
+    'ts': 'typescript',
+    'html': 'html',
+    'css': 'css',
+    'json': 'json',
+    'md': 'markdown',
+    'txt': 'text',
+    'yml': 'yaml',
+    'yaml': 'yaml',
+    'sh': 'bash',
+    'dockerfile': 'dockerfile',
+    'env': 'bash',
+    'gitignore': 'gitignore',
+    'sql': 'sql',
+    'java': 'java',
+    'cpp': 'cpp',
+    'c': 'c',
+    'php': 'php',
+    'rb': 'ruby',
+    'go': 'go',
+    'rs': 'rust',
+    'swift': 'swift',
+    'kt': 'kotlin',
+    'scala': 'scala'
+}
+
 def get_file_extension(file_path):
     """Get the file extension for syntax highlighting."""
-    import os
-    _, ext = os.path.splitext(file_path)
-    ext = ext.lower().lstrip('.')
-    
-    # Map common extensions to language identifiers
-    extension_map = {
-        'py': 'python',
-        'js': 'javascript',
-        'ts': 'typescript',
-        'html': 'html',
-        'css': 'css',
-        'json': 'json',
-        'md': 'markdown',
-        'txt': 'text',
-        'yml': 'yaml',
-        'yaml': 'yaml',
-        'sh': 'bash',
-        'dockerfile': 'dockerfile',
-        'env': 'bash',
-        'gitignore': 'gitignore',
-        'sql': 'sql',
-        'java': 'java',
-        'cpp': 'cpp',
-        'c': 'c',
-        'php': 'php',
-        'rb': 'ruby',
-        'go': 'go',
-        'rs': 'rust',
-        'swift': 'swift',
-        'kt': 'kotlin',
-        'scala': 'scala'
-    }
-    
-    return extension_map.get(ext, 'text')
-
-def create_basic_files_for_group(group):
-    """Create basic file content for a group when API generation fails."""
-    basic_files = {}
-    
-    if group['name'] == 'Core Application Files':
-        basic_files['src/main.py'] = '''#!/usr/bin/env python3
+    # Same result as os.path.splitext, without its general-purpose path handling
+    stem, _, ext = file_path.rpartition('/')[2].rpartition('.')
+    if not stem.strip('.'):
+        return 'text'  # no dot, or a dotfile such as .env
+    return _EXT_MAP.get(ext.lower(), 'text')
+
+# Fallback file contents used when a group's API generation fails
+_CORE_APP_FILES = {
+    'src/main.py': '''#!/usr/bin/env python3
 """
 Main application entry point.
 """
@@ -1508,18 +2085,21 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
+def _configure_logging():
+    """Configure root logging once; importing this module opens no files."""
+    if logging.getLogger().hasHandlers():
+        return
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('app.log', delay=True),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
 def main():
     """Main application function."""
     try:
@@ -1544,9 +2124,10 @@ def main():
         return 1
 
 if __name__ == "__main__":
+    _configure_logging()
     sys.exit(main())
-'''
-        basic_files['src/app.py'] = '''"""
+''',
+    'src/app.py': '''"""
 Main application module.
 """
 
@@ -1617,8 +2198,8 @@ if __name__ == "__main__":
     app = App()
     success = app.run()
     exit(0 if success else 1)
-'''
-        basic_files['src/config.py'] = '''"""
+''',
+    'src/config.py': '''"""
 Configuration settings and environment management.
 """
 
@@ -1632,6 +2213,40 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+def _to_bool(value: str) -> bool:
+    return value.lower() == 'true'
+
+def _to_list(value: str) -> list:
+    return value.split(',')
+
+# (setting, default, converter) read from the environment by Config
+_SCHEMA = (
+    # Application settings
+    ('DEBUG', 'False', _to_bool),
+    ('SECRET_KEY', 'your-secret-key-change-this-in-production', str),
+    ('APP_NAME', 'My Application', str),
+    ('APP_VERSION', '1.0.0', str),
+    # Database settings
+    ('DATABASE_URL', 'sqlite:///app.db', str),
+    ('DATABASE_POOL_SIZE', '10', int),
+    ('DATABASE_MAX_OVERFLOW', '20', int),
+    # Server settings
+    ('HOST', '0.0.0.0', str),
+    ('PORT', '8000', int),
+    # Security settings
+    ('ENABLE_CORS', 'True', _to_bool),
+    ('CORS_ORIGINS', '*', _to_list),
+    # Logging settings
+    ('LOG_LEVEL', 'INFO', str),
+    ('LOG_FILE', 'app.log', str),
+)
+
+# Settings safe to expose through to_dict (no secrets)
+_PUBLIC_KEYS = (
+    'DEBUG', 'APP_NAME', 'APP_VERSION', 'DATABASE_URL',
+    'HOST', 'PORT', 'ENABLE_CORS', 'LOG_LEVEL',
+)
+
 class Config:
     """Application configuration manager."""
     
@@ -1641,28 +2256,9 @@ class Config:
     
     def _load_config(self):
         """Load configuration from environment variables."""
-        # Application settings
-        self.DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
-        self.SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-this-in-production')
-        self.APP_NAME = os.getenv('APP_NAME', 'My Application')
-        self.APP_VERSION = os.getenv('APP_VERSION', '1.0.0')
-        
-        # Database settings
-        self.DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///app.db')
-        self.DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '10'))
-        self.DATABASE_MAX_OVERFLOW = int(os.getenv('DATABASE_MAX_OVERFLOW', '20'))
-        
-        # Server settings
-        self.HOST = os.getenv('HOST', '0.0.0.0')
-        self.PORT = int(os.getenv('PORT', '8000'))
-        
-        # Security settings
-        self.ENABLE_CORS = os.getenv('ENABLE_CORS', 'True').lower() == 'true'
-        self.CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
-        
-        # Logging settings
-        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-        self.LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+        env = os.environ
+        for name, default, convert in _SCHEMA:
+            setattr(self, name, convert(env.get(name, default)))
         
         logger.info("Configuration loaded successfully")
     
@@ -1672,16 +2268,7 @@ class Config:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to dictionary."""
-        return {
-            'DEBUG': self.DEBUG,
-            'APP_NAME': self.APP_NAME,
-            'APP_VERSION': self.APP_VERSION,
-            'DATABASE_URL': self.DATABASE_URL,
-            'HOST': self.HOST,
-            'PORT': self.PORT,
-            'ENABLE_CORS': self.ENABLE_CORS,
-            'LOG_LEVEL': self.LOG_LEVEL
-        }
+        return {key: getattr(self, key) for key in _PUBLIC_KEYS}
     
     def validate(self) -> bool:
         """Validate configuration."""
@@ -1694,8 +2281,8 @@ class Config:
 
 # Global configuration instance
 config = Config()
-'''
-        basic_files['src/utils.py'] = '''"""
+''',
+    'src/utils.py': '''"""
 Utility functions and helper modules.
 """
 
@@ -1710,6 +2297,15 @@ from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Characters stripped by sanitize_input
+_SANITIZE_RE = re.compile(r'[<>"\\']')
+
+# Hash functions supported by generate_hash
+_HASH_ALGORITHMS = {
+    'sha256': hashlib.sha256,
+    'md5': hashlib.md5,
+}
+
 def setup_logging(
     level: str = "INFO",
     log_file: Optional[str] = None,
@@ -1773,7 +2369,7 @@ def sanitize_input(data: str) -> str:
         return str(data)
     
     # Remove potentially dangerous characters
-    sanitized = re.sub(r'[<>"\']', '', data)
+    sanitized = _SANITIZE_RE.sub('', data)
     return sanitized.strip()
 
 def generate_hash(data: str, algorithm: str = 'sha256') -> str:
@@ -1786,12 +2382,10 @@ def generate_hash(data: str, algorithm: str = 'sha256') -> str:
     Returns:
         Hash string
     """
-    if algorithm == 'sha256':
-        return hashlib.sha256(data.encode()).hexdigest()
-    elif algorithm == 'md5':
-        return hashlib.md5(data.encode()).hexdigest()
-    else:
+    hash_func = _HASH_ALGORITHMS.get(algorithm)
+    if hash_func is None:
         raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+    return hash_func(data.encode()).hexdigest()
 
 def load_json_file(file_path: str) -> Dict[str, Any]:
     """Load JSON file safely.
@@ -1859,10 +2453,11 @@ def get_file_size(file_path: str) -> int:
         return 0
     
     return os.path.getsize(file_path)
-'''
-    
-    elif group['name'] == 'Configuration & Setup':
-        basic_files['requirements.txt'] = '''# Core dependencies
+''',
+}
+
+_CONFIG_SETUP_FILES = {
+    'requirements.txt': '''# Core dependencies
 python-dotenv>=1.0.0
 requests>=2.31.0
 typing-extensions>=4.0.0
@@ -1887,8 +2482,8 @@ flake8>=6.0.0
 mypy>=1.0.0
 
 # Add your specific dependencies here
-'''
-        basic_files['README.md'] = '''# My Application
+''',
+    'README.md': '''# My Application
 
 ## Description
 A production-ready Python application with comprehensive error handling, logging, and configuration management.
@@ -2100,15 +2695,15 @@ For support and questions:
 - Create an issue in the repository
 - Check the documentation in `docs/` directory
 - Review the troubleshooting section above
-'''
-        basic_files['.env.example'] = '''# Application Configuration
+''',
+    '.env.example': '''# Application Configuration
 DEBUG=False
 SECRET_KEY=your-secret-key-here
 DATABASE_URL=sqlite:///app.db
 
 # Add your environment variables here
-'''
-        basic_files['.gitignore'] = '''# Python
+''',
+    '.gitignore': '''# Python
 __pycache__/
 *.py[cod]
 *$py.class
@@ -2143,10 +2738,11 @@ wheels/
 # OS
 .DS_Store
 Thumbs.db
-'''
-    
-    elif group['name'] == 'Documentation & Tests':
-        basic_files['tests/test_main.py'] = '''"""
+''',
+}
+
+_DOCS_TEST_FILES = {
+    'tests/test_main.py': '''"""
 Tests for main application module.
 """
 
@@ -2380,8 +2976,8 @@ class TestUtils(unittest.TestCase):
 
 if __name__ == '__main__':
     unittest.main()
-'''
-        basic_files['docs/README.md'] = '''# Documentation
+''',
+    'docs/README.md': '''# Documentation
 
 ## Overview
 This document provides an overview of the project.
@@ -2391,10 +2987,11 @@ Document your API endpoints here.
 
 ## Examples
 Provide usage examples here.
-'''
-    
-    elif group['name'] == 'Deployment & DevOps':
-        basic_files['Dockerfile'] = '''# Use Python 3.11 slim image
+''',
+}
+
+_DEPLOY_FILES = {
+    'Dockerfile': '''# Use Python 3.11 slim image
 FROM python:3.11-slim
 
 # Set environment variables
@@ -2435,8 +3032,8 @@ HEALTHCHECK --interval=30s --timeout=30s --start-period=5s --retries=3 \
 
 # Run the application
 CMD ["python", "src/main.py"]
-'''
-        basic_files['docker-compose.yml'] = '''version: '3.8'
+''',
+    'docker-compose.yml': '''version: '3.8'
 
 services:
   app:
@@ -2447,9 +3044,24 @@ services:
       - DEBUG=False
     volumes:
       - .:/app
-'''
-    
-    return basic_files
+''',
+}
+
+# Read-only views, shared by every caller instead of copied per call
+_GROUP_FILES = {
+    'Core Application Files': MappingProxyType(_CORE_APP_FILES),
+    'Configuration & Setup': MappingProxyType(_CONFIG_SETUP_FILES),
+    'Documentation & Tests': MappingProxyType(_DOCS_TEST_FILES),
+    'Deployment & DevOps': MappingProxyType(_DEPLOY_FILES),
+}
+_NO_FILES = MappingProxyType({})
+
+def create_basic_files_for_group(group):
+    """
+    Return basic file content for a group when API generation fails.
+    The mapping is read-only; copy it with dict() before modifying.
+    """
+    return _GROUP_FILES.get(group['name'], _NO_FILES)
 
 # --- Auth UI ---
 def login_ui():
@@ -2505,68 +3117,52 @@ def chat_ui():
     user = st.session_state.user
     user_id = get_user_id(user)
 
-    # Determine model type for use throughout the function
-    selected_model = st.session_state.get("selected_model", "gemini-2.5-pro")
-    if selected_model.startswith("gemini"):
-        model_type = "gemini"
-    elif selected_model.startswith("openai"):
-        model_type = "openai"
-    else:
-        model_type = "gemini"  # Default fallback
-
     # --- Sidebar Layout ---
     with st.sidebar:
         st.header("🤖 AI Chat Navigation")
         
         # Model selection with provider grouping
-        model_categories = {
-            "Gemini": {
-                "gemini-2.5-pro": "Gemini 2.5 Pro",
-                "gemini-1.5-pro": "Gemini 1.5 Pro", 
-                "gemini-1.5-flash": "Gemini 1.5 Flash"
-            },
-            "OpenAI": {
-                "gpt-4o": "GPT-4o",
-                "gpt-4o-mini": "GPT-4o Mini",
-                "gpt-4-turbo": "GPT-4 Turbo",
-                "gpt-3.5-turbo": "GPT-3.5 Turbo"
-            }
-        }
-        
         if "selected_provider" not in st.session_state:
             st.session_state.selected_provider = "Gemini"
         if "selected_model" not in st.session_state:
             st.session_state.selected_model = "gemini-2.5-pro"
             
-        provider_list = list(model_categories.keys())
         selected_provider = st.selectbox(
             "Model Provider",
-            provider_list,
-            index=provider_list.index(st.session_state.selected_provider),
+            _PROVIDER_LIST,
+            index=_PROVIDER_INDEX[st.session_state.selected_provider],
             key="sidebar_provider"
         )
         
+        # Selection changes are applied in this pass; the model selectbox
+        # below already renders the new provider's options, so no rerun
         if selected_provider != st.session_state.selected_provider:
             st.session_state.selected_provider = selected_provider
-            st.session_state.selected_model = list(model_categories[selected_provider].keys())[0]
-            st.rerun()
+            st.session_state.selected_model = _MODEL_KEYS[selected_provider][0]
             
-        model_dict = model_categories[selected_provider]
-        model_keys = list(model_dict.keys())
-        if st.session_state.selected_model not in model_keys:
+        model_dict = _MODEL_CATEGORIES[selected_provider]
+        model_keys = _MODEL_KEYS[selected_provider]
+        model_index = _MODEL_INDEX[selected_provider]
+        if st.session_state.selected_model not in model_index:
             st.session_state.selected_model = model_keys[0]
             
         selected_model = st.selectbox(
             "Model Version",
             model_keys,
             format_func=lambda x: model_dict[x],
-            index=model_keys.index(st.session_state.selected_model),
+            index=model_index[st.session_state.selected_model],
             key="sidebar_model"
         )
         
-        if selected_model != st.session_state.selected_model:
-            st.session_state.selected_model = selected_model
-            st.rerun()
+        st.session_state.selected_model = selected_model
+        
+        # Determine model type for use throughout the function
+        if selected_model.startswith("gemini"):
+            model_type = "gemini"
+        elif selected_model.startswith("openai"):
+            model_type = "openai"
+        else:
+            model_type = "gemini"  # Default fallback
             
         # New Chat button
         if st.button("🆕 New Chat", key="sidebar_new_chat", use_container_width=True, type="primary"):
@@ -2574,8 +3170,10 @@ def chat_ui():
             reset_session_for_new_chat()
             
             new_chat_id = create_new_chat(user_id, model_type=model_type)
+            invalidate_chat_list()
             st.session_state.selected_chat_id = new_chat_id
             st.session_state.chat_history = []
+            st.session_state.last_loaded_chat_id = new_chat_id
             st.session_state.search_query = ""
             st.rerun()
             
@@ -2585,20 +3183,20 @@ def chat_ui():
         
         # List chats (filtered)
         try:
-            chat_sessions = list_user_chats(user_id, model_type)
-            filtered_chats = [c for c in chat_sessions if search_query.lower() in c["title"].lower()]
+            filtered_chats = get_user_chats(user_id, model_type, search_query)
             chat_ids = [c['chat_id'] for c in filtered_chats]
+            chat_by_id = {c['chat_id']: c for c in filtered_chats}
             
             # Use radio button for chat selection
             if chat_ids:
-                selected_chat_idx = chat_ids.index(st.session_state.get("selected_chat_id")) if st.session_state.get("selected_chat_id") in chat_ids else 0
+                selected_chat_idx = chat_ids.index(st.session_state.get("selected_chat_id")) if st.session_state.get("selected_chat_id") in chat_by_id else 0
                 selected_radio = st.radio(
                     "💬 Recent Chats:",
                     options=chat_ids,
                     format_func=lambda cid: (
-                        ("📁 " if filtered_chats[chat_ids.index(cid)].get("has_project_files") else "") +
-                        filtered_chats[chat_ids.index(cid)]["title"][:30] + 
-                        ("..." if len(filtered_chats[chat_ids.index(cid)]["title"]) > 30 else "")
+                        ("📁 " if chat_by_id[cid].get("has_project_files") else "") +
+                        chat_by_id[cid]["title"][:30] + 
+                        ("..." if len(chat_by_id[cid]["title"]) > 30 else "")
                     ),
                     index=selected_chat_idx,
                     key="sidebar_chat_radio"
@@ -2606,6 +3204,8 @@ def chat_ui():
                 if selected_radio != st.session_state.get("selected_chat_id"):
                     st.session_state.selected_chat_id = selected_radio
                     st.session_state.chat_history = get_chat_history(user_id, selected_radio)
+                    # Tell the main window this history is already loaded
+                    st.session_state.last_loaded_chat_id = selected_radio
                     
                     # Restore chat context with RAG
                     if RAG_AVAILABLE:
@@ -2631,18 +3231,16 @@ def chat_ui():
             if st.session_state.get("selected_chat_id"):
                 if st.button("🗑️ Delete Chat", key="sidebar_delete_chat", use_container_width=True):
                     try:
-                        from firebase_utils import db
-                        chat_ref = db.collection('users').document(user_id).collection('chats').document(st.session_state.selected_chat_id)
-                        chat_ref.delete()
+                        delete_chat(user_id, st.session_state.selected_chat_id)
                         
                         # Refresh chat list and select new chat
-                        chat_sessions = list_user_chats(user_id, model_type)
-                        filtered_chats = [c for c in chat_sessions if search_query.lower() in c["title"].lower()]
+                        filtered_chats = get_user_chats(user_id, model_type, search_query)
                         chat_ids = [c['chat_id'] for c in filtered_chats]
                         
                         if chat_ids:
                             st.session_state.selected_chat_id = chat_ids[0]
                             st.session_state.chat_history = get_chat_history(user_id, chat_ids[0])
+                            st.session_state.last_loaded_chat_id = chat_ids[0]
                         else:
                             st.session_state.selected_chat_id = None
                             st.session_state.chat_history = []
@@ -2664,27 +3262,22 @@ def chat_ui():
             st.session_state.last_loaded_chat_id = st.session_state.selected_chat_id
 
         # --- ENHANCEMENT: Show current model and agent in chat header ---
-        model_dict = {
-            "gemini-2.5-pro": "Gemini 2.5 Pro",
-            "gemini-1.5-pro": "Gemini 1.5 Pro",
-            "gemini-1.5-flash": "Gemini 1.5 Flash",
-            "gpt-4o": "GPT-4o",
-            "gpt-4o-mini": "GPT-4o Mini",
-            "gpt-4-turbo": "GPT-4 Turbo",
-            "gpt-3.5-turbo": "GPT-3.5 Turbo"
-        }
         selected_model = st.session_state.get("selected_model", "gemini-2.5-pro")
         selected_agent = st.session_state.get("selected_agent", "🚀 Project Generator")
-        model_display = model_dict.get(selected_model, selected_model)
+        model_display = _MODEL_DISPLAY_NAMES.get(selected_model, selected_model)
         st.markdown(f"<div style='background:#f5f6fa;padding:10px 16px;border-radius:8px;margin-bottom:8px;'><b>Model:</b> {model_display} &nbsp; | &nbsp; <b>Agent:</b> {selected_agent}</div>", unsafe_allow_html=True)
 
+        # Read-only views for the status and download UI below
+        gen_state = st.session_state.project_generation_state
+        project_context = st.session_state.project_context
+
         # Show RAG status
-        if st.session_state.project_context.get('indexed'):
-            total_files = st.session_state.project_context.get('total_files', 0)
+        if project_context.get('indexed'):
+            total_files = project_context.get('total_files', 0)
             st.success(f"🧠 **RAG Active**: {total_files} files indexed for intelligent context")
 
         # Show project generation status
-        if st.session_state.project_generation_state.get("is_generating"):
+        if gen_state.get("is_generating"):
             with st.status("🚀 Generating Project...", expanded=True) as status:
                 st.write("📋 Analyzing requirements...")
                 st.write("🏗️ Planning architecture...")
@@ -2695,27 +3288,21 @@ def chat_ui():
                 status.update(label="🎉 Project Generation Complete!", state="complete")
 
         # Show project generation progress
-        if st.session_state.project_generation_state.get("current_step"):
-            current_step = st.session_state.project_generation_state.get("current_step")
+        if gen_state.get("current_step"):
+            current_step = gen_state.get("current_step")
             st.info(f"🔄 **Current Step**: {current_step}")
         
         # Show interactive workflow status
-        workflow_step = st.session_state.project_generation_state.get("workflow_step", "initial")
+        workflow_step = gen_state.get("workflow_step", "initial")
         if workflow_step != "initial" and workflow_step != "complete":
-            workflow_status = {
-                "tech_stack_selection": "🎯 **Tech Stack Selection** - Choose your preferred technology stack",
-                "architecture_review": "🏗️ **Architecture Review** - Review and confirm project structure",
-                "group_generation": "💻 **File Generation** - Generating complete code files in groups"
-            }
-            
-            if workflow_step in workflow_status:
-                st.info(workflow_status[workflow_step])
+            if workflow_step in _WORKFLOW_STATUS:
+                st.info(_WORKFLOW_STATUS[workflow_step])
                 
                 # Show progress for group generation
                 if workflow_step == "group_generation":
-                    file_groups = st.session_state.project_generation_state.get("file_groups", [])
-                    current_group_index = st.session_state.project_generation_state.get("current_group_index", 0)
-                    generated_groups = st.session_state.project_generation_state.get("generated_groups", [])
+                    file_groups = gen_state.get("file_groups", [])
+                    current_group_index = gen_state.get("current_group_index", 0)
+                    generated_groups = gen_state.get("generated_groups", [])
                     
                     if file_groups:
                         progress_text = f"📊 **Progress**: Group {current_group_index + 1} of {len(file_groups)}"
@@ -2724,31 +3311,25 @@ def chat_ui():
                         st.success(progress_text)
 
         # Display chat history
-        for msg in st.session_state.chat_history:
+        for msg, mermaid_blocks, markdown in rendered_chat_history():
             with st.chat_message(msg["role"]):
-                content = msg["content"]
                 # --- ENHANCEMENT: Show RAG context summary above assistant responses ---
                 if msg["role"] == "assistant" and msg.get("rag_context_files"):
                     rag_files = msg["rag_context_files"]
                     st.info(f"**RAG Context Used:** {', '.join(rag_files)}")
-                # Check for mermaid diagrams in message
-                if '```mermaid' in content:
-                    mermaid_blocks = re.findall(r'```mermaid(.*?)```', content, re.DOTALL)
-                    for block in mermaid_blocks:
-                        render_mermaid(block.strip())
-                    non_mermaid = re.sub(r'```mermaid.*?```', '', content, flags=re.DOTALL).strip()
-                    if non_mermaid:
-                        st.markdown(non_mermaid)
-                else:
-                    st.markdown(content)
+                # Mermaid diagrams were split out of the message when it was added
+                for block in mermaid_blocks:
+                    render_mermaid(block)
+                if markdown or not mermaid_blocks:
+                    st.markdown(markdown)
 
         # --- PROJECT GENERATION DOWNLOAD UI ---
-        if st.session_state.project_generation_state.get("generation_complete") and st.session_state.project_generation_state.get("zip_data"):
+        if gen_state.get("generation_complete") and gen_state.get("zip_data"):
             st.markdown("---")
             st.markdown("### 🎉 **Project Generation Complete!**")
             
             # Show generated files
-            generated_files = st.session_state.project_generation_state.get("generated_files", {})
+            generated_files = gen_state.get("generated_files", {})
             if generated_files:
                 col1, col2 = st.columns([2, 1])
                 
@@ -2760,7 +3341,7 @@ def chat_ui():
                 
                 with col2:
                     # Download button
-                    zip_data = st.session_state.project_generation_state.get("zip_data")
+                    zip_data = gen_state.get("zip_data")
                     if zip_data:
                         st.download_button(
                             label="💾 Download Complete Project",
@@ -2780,6 +3361,8 @@ def chat_ui():
             
             with col1:
                 if st.button("🔄 **Regenerate Project**", use_container_width=True):
+                    # Ask the model again instead of replaying cached answers
+                    st.session_state.llm_cache_refresh = True
                     st.session_state.project_generation_state["generation_complete"] = False
                     st.session_state.project_generation_state["zip_data"] = None
                     st.rerun()
@@ -2787,32 +3370,10 @@ def chat_ui():
             with col2:
                 if st.button("📝 **Request Changes**", use_container_width=True):
                     st.session_state.auto_send_prompt = "Please modify the generated project with the following changes: [describe your changes here]"
-                    st.rerun()
             
             with col3:
                 if st.button("✅ **Project Complete**", use_container_width=True):
-                    st.session_state.project_generation_state = {
-                        "is_generating": False,
-                        "current_step": None,
-                        "generated_files": [],
-                        "project_name": "",
-                        "tech_stack": [],
-                        "architecture": "",
-                        "user_feedback": "",
-                        "generation_complete": False,
-                        "zip_data": None,
-                        # Reset interactive workflow states
-                        "workflow_step": "initial",
-                        "requirements": "",
-                        "suggested_tech_stack": {},
-                        "selected_tech_stack": "",
-                        "project_architecture": "",
-                        "file_groups": [],
-                        "current_group_index": 0,
-                        "generated_groups": [],
-                        "user_confirmations": {},
-                        "project_description": ""
-                    }
+                    st.session_state.project_generation_state = new_project_generation_state()
                     st.success("🎉 Project marked as complete!")
                     st.rerun()
 
@@ -2822,14 +3383,9 @@ def chat_ui():
             
             with col1:
                 # Download chat button
-                chat_md = ""
-                for msg in st.session_state.chat_history:
-                    role = msg.get("role", "user").capitalize()
-                    content = msg.get("content", "")
-                    chat_md += f"\n**{role}:**\n\n{content}\n\n"
                 st.download_button(
                     label="💾 Download",
-                    data=chat_md,
+                    data=chat_history_markdown(),
                     file_name="chat.md",
                     mime="text/markdown",
                     use_container_width=True
@@ -2838,11 +3394,15 @@ def chat_ui():
             with col2:
                 # Generate Mermaid Diagram Button
                 if st.button("📊 Diagram", use_container_width=True):
-                    # Get the last assistant response
+                    # Get the last assistant response, skipping earlier diagrams so a
+                    # repeat click reuses the cached answer for the same content
                     last_assistant_msg = None
                     for msg in reversed(st.session_state.chat_history):
                         if msg.get("role") == "assistant":
-                            last_assistant_msg = msg.get("content", "")
+                            msg_content = msg.get("content", "")
+                            if msg_content.startswith(DIAGRAM_MESSAGE_HEADER):
+                                continue
+                            last_assistant_msg = msg_content
                             break
                     
                     if last_assistant_msg:
@@ -2853,19 +3413,17 @@ def chat_ui():
                                     "Create a clear, professional workflow diagram in Mermaid syntax based on this content. "
                                     "Only output valid Mermaid code in a code block. Use flowchart format (graph TD).\n\n" + last_assistant_msg[:800]
                                 )
-                                mermaid_code = generate_gemini_response([
-                                    {"role": "user", "content": diagram_prompt}
-                                ], model_name="gemini-2.5-pro")
+                                mermaid_code = cached_generate(diagram_prompt, "gemini-2.5-pro")
                                 
                                 if mermaid_code and '```mermaid' in mermaid_code:
-                                    mermaid_blocks = re.findall(r'```mermaid(.*?)```', mermaid_code, re.DOTALL)
+                                    mermaid_blocks = _MERMAID_BLOCK_RE.findall(mermaid_code)
                                     for block in mermaid_blocks:
                                         with st.chat_message("assistant"):
-                                            st.markdown("**📊 Generated Workflow Diagram:**")
+                                            st.markdown(DIAGRAM_MESSAGE_HEADER)
                                             render_mermaid(block.strip())
                                             
                                             # Add to chat history
-                                            diagram_msg = {"role": "assistant", "content": f"📊 **Generated Workflow Diagram:**\n\n```mermaid\n{block.strip()}\n```"}
+                                            diagram_msg = {"role": "assistant", "content": f"{DIAGRAM_MESSAGE_HEADER}\n\n```mermaid\n{block.strip()}\n```"}
                                             st.session_state.chat_history.append(diagram_msg)
                                             add_message_to_chat(user_id, st.session_state.selected_chat_id, diagram_msg, model_type=model_type)
                                 else:
@@ -2879,8 +3437,7 @@ def chat_ui():
                 # Clear current chat button
                 if st.button("🧹 Clear", use_container_width=True):
                     st.session_state.chat_history = []
-                    from firebase_utils import db
-                    chat_ref = db.collection('users').document(user_id).collection('chats').document(st.session_state.selected_chat_id)
+                    chat_ref = _chat_ref(user_id, st.session_state.selected_chat_id)
                     chat_ref.update({'history': [], 'title': 'New Chat Session'})
                     reset_session_for_new_chat()
                     st.success("🧹 Chat cleared!")
@@ -2899,16 +3456,10 @@ def chat_ui():
         
         with col1:
             # Agent selection
-            agent_options = [
-                "🚀 Project Generator",
-                "🔍 Project Analyzer", 
-                "🛠️ Code Assistant"
-            ]
-            
             selected_agent = st.selectbox(
                 "🤖 **AI Assistant Type**",
-                agent_options,
-                index=agent_options.index(st.session_state.get("selected_agent", "🚀 Project Generator")) if st.session_state.get("selected_agent") in agent_options else 0
+                _AGENT_OPTIONS,
+                index=_AGENT_INDEX.get(st.session_state.get("selected_agent"), 0)
             )
             st.session_state.selected_agent = selected_agent
         
@@ -2945,7 +3496,7 @@ def chat_ui():
                 # Show preview of uploaded files
                 with st.expander("📋 **Uploaded Files Preview**", expanded=False):
                     for file in uploaded_files:
-                        file_type = "📄 Document" if any(ext in file.name.lower() for ext in ['.docx', '.doc', '.pdf', '.txt', '.md']) else "💻 Code"
+                        file_type = "📄 Document" if is_doc_file(file.name) else "💻 Code"
                         st.write(f"{file_type} **{file.name}** ({file.size:,} bytes)")
                 
                 if st.button("🚀 **Process Files with RAG**", type="primary"):
@@ -2961,7 +3512,7 @@ def chat_ui():
                                 
                                 # Show what was uploaded for Project Generator
                                 if selected_agent == "🚀 Project Generator":
-                                    req_docs = [f for f in files_content.keys() if any(ext in f.lower() for ext in ['.docx', '.doc', '.pdf', '.txt', '.md'])]
+                                    req_docs = [f for f in files_content.keys() if is_doc_file(f)]
                                     if req_docs:
                                         st.info(f"📋 **Requirements documents uploaded**: {', '.join(req_docs)}\n\n**Next step**: Ask me to 'create full project code' or 'implement the requirements'")
                                 
@@ -3014,7 +3565,7 @@ def chat_ui():
 
         # Quick action buttons for Project Generator
         if selected_agent == "🚀 Project Generator" and st.session_state.project_context.get('indexed'):
-            req_docs = [f for f in st.session_state.project_context.get('files', {}).keys() if any(ext in f.lower() for ext in ['.docx', '.doc', '.pdf', '.txt', '.md'])]
+            req_docs = [f for f in st.session_state.project_context.get('files', {}).keys() if is_doc_file(f)]
             if req_docs:
                 st.markdown("---")
                 st.markdown("**🚀 Quick Actions for Project Generator:**")
@@ -3024,19 +3575,16 @@ def chat_ui():
                     if st.button("📋 **Implement Requirements**", use_container_width=True):
                         quick_prompt = "Analyze the uploaded requirements document deeply and create a SOPHISTICATED, ENTERPRISE-GRADE project with FULL SOURCE CODE implementation. Generate ALL necessary files with COMPLETE, EXECUTABLE, PRODUCTION-READY code that matches the complexity of the requirements. Use appropriate architecture patterns, design principles, security measures, and performance optimizations. NO placeholders, NO TODOs, NO skeleton code - create sophisticated, working implementations with proper error handling, logging, security, and scalability."
                         st.session_state.auto_send_prompt = quick_prompt
-                        st.rerun()
                 
                 with col2:
                     if st.button("🏗️ **Create Full Project**", use_container_width=True):
                         quick_prompt = "Based on the uploaded requirements document, create a COMPLETE, ENTERPRISE-GRADE project structure with ALL source code files containing SOPHISTICATED, PRODUCTION-READY code. Analyze the project complexity and implement appropriate architecture patterns (Clean Architecture, SOLID principles, design patterns). Include comprehensive security measures, performance optimizations, error handling, logging, and monitoring. Every file must be complete with all imports, functions, classes, and be immediately executable and deployable."
                         st.session_state.auto_send_prompt = quick_prompt
-                        st.rerun()
                 
                 with col3:
                     if st.button("💻 **Generate Code**", use_container_width=True):
                         quick_prompt = "Read the uploaded requirements document carefully and generate SOPHISTICATED, ENTERPRISE-GRADE source code that implements all specified features with production-ready quality. Every file must contain FULL implementations with appropriate design patterns, comprehensive error handling, security measures, performance optimizations, proper logging, and monitoring. Use SOLID principles, clean architecture, and enterprise best practices. NO PLACEHOLDER CODE, NO TODOs, NO INCOMPLETE FUNCTIONS - create sophisticated, working, scalable implementations."
                         st.session_state.auto_send_prompt = quick_prompt
-                        st.rerun()
         
         # Additional quick actions for Project Generator (always show)
         if selected_agent == "🚀 Project Generator":
@@ -3048,30 +3596,27 @@ def chat_ui():
                 if st.button("📁 **Generate All Files**", use_container_width=True):
                     quick_prompt = "Create a complete project with ALL necessary files containing FULL, WORKING, PRODUCTION-READY code. Every file must be complete with all imports, functions, classes, error handling, logging, and be immediately executable. NO PLACEHOLDER CODE, NO SKELETONS, NO INCOMPLETE IMPLEMENTATIONS - everything must be complete and runnable."
                     st.session_state.auto_send_prompt = quick_prompt
-                    st.rerun()
             
             with col2:
                 if st.button("🔧 **Setup & Config**", use_container_width=True):
                     quick_prompt = "Generate all configuration files, setup scripts, and deployment configurations for the project. Include package.json/requirements.txt, Dockerfile, .env.example, and other essential config files."
                     st.session_state.auto_send_prompt = quick_prompt
-                    st.rerun()
             
             with col3:
                 if st.button("📚 **Documentation**", use_container_width=True):
                     quick_prompt = "Create comprehensive documentation including README.md, API documentation, setup instructions, user guides, and developer documentation for the project."
                     st.session_state.auto_send_prompt = quick_prompt
-                    st.rerun()
             
             with col4:
                 if st.button("🧪 **Tests & Validation**", use_container_width=True):
                     quick_prompt = "Generate comprehensive test suites including unit tests, integration tests, and validation scripts. Include test configuration and coverage reports."
                     st.session_state.auto_send_prompt = quick_prompt
-                    st.rerun()
 
         # Chat input form - ALWAYS show
         st.markdown("---")
         
-        # Check for auto-send prompt from quick action buttons
+        # Check for auto-send prompt from quick action buttons. They are all
+        # rendered above this point, so a click fills the form in the same run
         auto_prompt = st.session_state.get('auto_send_prompt', '')
         
         with st.form("chat_form", clear_on_submit=True):
@@ -3104,14 +3649,8 @@ def chat_ui():
             # Enhanced RAG context for project generation agents
             if selected_agent in ["🚀 Project Generator", "🛠️ Code Assistant"]:
                 # Get additional context for project generation
-                additional_queries = [
-                    "architecture patterns design structure",
-                    "dependencies requirements configuration",
-                    "testing validation best practices",
-                    "security authentication authorization"
-                ]
-                for query in additional_queries:
-                    extra_context = get_rag_context(query, max_results=2) if RAG_AVAILABLE else []
+                for query in ADDITIONAL_RAG_QUERIES:
+                    extra_context = get_static_rag_context(query, max_results=2) if RAG_AVAILABLE else []
                     rag_context.extend(extra_context)
                 
                 # Remove duplicates
@@ -3124,13 +3663,25 @@ def chat_ui():
                 rag_context = unique_context[:10]  # Limit to top 10 most relevant
             
             # Generate AI response using selected agent
-            with st.spinner("🤖 Generating response..."):
-                response = generate_agent_response(
-                    prompt,
-                    selected_agent,
-                    selected_model,
-                    rag_context=rag_context
-                )
+            if selected_agent == "🚀 Project Generator":
+                # The workflow below post-processes the full response before showing it
+                with st.spinner("🤖 Generating response..."):
+                    response = generate_agent_response(
+                        prompt,
+                        selected_agent,
+                        selected_model,
+                        rag_context=rag_context
+                    )
+            else:
+                # Show tokens as they arrive; write_stream returns the full text
+                with st.chat_message("assistant"):
+                    response = st.write_stream(generate_agent_response(
+                        prompt,
+                        selected_agent,
+                        selected_model,
+                        rag_context=rag_context,
+                        stream=True
+                    ))
             
             # For Project Generator, handle interactive workflow
             if selected_agent == "🚀 Project Generator":
@@ -3467,19 +4018,29 @@ Group 4: Deployment & DevOps
                         response += f"\n\n✅ **Architecture Confirmed!**\n\n"
                         response += f"Starting group-by-group file generation...\n\n"
                         
-                        # Generate first group
+                        # Generate first group together with every other independent group
                         file_groups = st.session_state.project_generation_state["file_groups"]
                         if file_groups:
                             current_group = file_groups[0]
                             try:
-                                with st.spinner(f"💻 Generating {current_group['name']}..."):
-                                    group_response = generate_file_group(
-                                        current_group['name'],
-                                        current_group['files'],
+                                with st.spinner(f"💻 Generating {current_group['name']} and other independent groups..."):
+                                    prefetched = prefetch_file_groups(
+                                        file_groups,
                                         st.session_state.project_generation_state["requirements"],
                                         st.session_state.project_generation_state["selected_tech_stack"],
-                                        st.session_state.project_generation_state["project_architecture"]
+                                        st.session_state.project_generation_state["project_architecture"],
+                                        st.session_state.get("selected_model", "gemini-2.5-pro")
                                     )
+                                    group_response = prefetched.pop(0, None)
+                                    st.session_state.project_generation_state["prefetched_groups"] = prefetched
+                                    if group_response is None:
+                                        group_response = generate_file_group(
+                                            current_group['name'],
+                                            current_group['files'],
+                                            st.session_state.project_generation_state["requirements"],
+                                            st.session_state.project_generation_state["selected_tech_stack"],
+                                            st.session_state.project_generation_state["project_architecture"]
+                                        )
                                 
                                 # Check if generation failed
                                 if not group_response or "error" in group_response.lower() or "500" in group_response:
@@ -3637,15 +4198,18 @@ For each file:
                             next_group = file_groups[next_index]
                             previous_groups = st.session_state.project_generation_state["generated_groups"]
                             
-                            with st.spinner(f"💻 Generating {next_group['name']}..."):
-                                group_response = generate_file_group(
-                                    next_group['name'],
-                                    next_group['files'],
-                                    st.session_state.project_generation_state["requirements"],
-                                    st.session_state.project_generation_state["selected_tech_stack"],
-                                    st.session_state.project_generation_state["project_architecture"],
-                                    previous_groups
-                                )
+                            # Independent groups were already generated at architecture confirmation
+                            group_response = st.session_state.project_generation_state.get("prefetched_groups", {}).pop(next_index, None)
+                            if group_response is None:
+                                with st.spinner(f"💻 Generating {next_group['name']}..."):
+                                    group_response = generate_file_group(
+                                        next_group['name'],
+                                        next_group['files'],
+                                        st.session_state.project_generation_state["requirements"],
+                                        st.session_state.project_generation_state["selected_tech_stack"],
+                                        st.session_state.project_generation_state["project_architecture"],
+                                        previous_groups
+                                    )
                             
                             # Extract files from group response
                             extracted_files = extract_project_files_from_response(group_response)
@@ -3694,6 +4258,7 @@ For each file:
                             st.session_state.project_generation_state["zip_data"] = zip_data
                             st.session_state.project_generation_state["generated_files"] = all_files
                             st.session_state.project_generation_state["generation_complete"] = True
+                            st.session_state.llm_cache_refresh = False
                             
                             response = f"🎉 **Step 4: Project Complete!**\n\n"
                             response += f"**Generated {len(all_files)} files in {len(st.session_state.project_generation_state['generated_groups'])} groups:**\n"
@@ -3723,27 +4288,7 @@ For each file:
                     # Handle other cases or restart workflow
                     if any(keyword in prompt.lower() for keyword in ["start over", "restart", "new project", "begin"]):
                         # Reset workflow
-                        st.session_state.project_generation_state = {
-                            "is_generating": False,
-                            "current_step": None,
-                            "generated_files": [],
-                            "project_name": "",
-                            "tech_stack": [],
-                            "architecture": "",
-                            "user_feedback": "",
-                            "generation_complete": False,
-                            "zip_data": None,
-                            "workflow_step": "initial",
-                            "requirements": "",
-                            "suggested_tech_stack": {},
-                            "selected_tech_stack": "",
-                            "project_architecture": "",
-                            "file_groups": [],
-                            "current_group_index": 0,
-                            "generated_groups": [],
-                            "user_confirmations": {},
-                            "project_description": ""
-                        }
+                        st.session_state.project_generation_state = new_project_generation_state()
                         
                         response = f"🔄 **Workflow Reset**\n\n"
                         response += f"Starting fresh project generation. Please provide your project requirements."
@@ -3755,6 +4300,7 @@ For each file:
                             # Store files in session state
                             st.session_state.project_generation_state["generated_files"] = extracted_files
                             st.session_state.project_generation_state["generation_complete"] = True
+                            st.session_state.llm_cache_refresh = False
                             
                             # Create ZIP file
                             project_name = "generated_project"
@@ -3785,16 +4331,17 @@ For each file:
             
             # Update chat title if it's a new chat
             try:
-                from firebase_utils import regenerate_chat_title, db
-                chat_doc = get_chat_history(user_id, st.session_state.selected_chat_id)
-                user_msgs = [m for m in chat_doc if m.get("role") == "user"]
-                chat_ref = db.collection('users').document(user_id).collection('chats').document(st.session_state.selected_chat_id)
+                # The session history mirrors what was just written to Firestore
+                user_msgs = [m for m in st.session_state.chat_history if m.get("role") == "user"]
+                chat_ref = _chat_ref(user_id, st.session_state.selected_chat_id)
                 chat_data = chat_ref.get().to_dict()
                 chat_title = chat_data.get('title', '') if chat_data else ''
                 if len(user_msgs) >= 2 and (chat_title.startswith('New Chat') or chat_title == 'Chat'):
                     regenerate_chat_title(user_id, st.session_state.selected_chat_id, model_type)
             except:
                 pass  # Skip title update if there's an error
+            # The sidebar title may derive from the new messages
+            invalidate_chat_list()
                 
             # Rerun to display updated chat history
             st.rerun()
@@ -0,0 +1,85 @@
+"""Small helpers for the on-disk caches used by the command-line pipeline."""
+
+import hashlib
+import os
+import tempfile
+from typing import List, Tuple
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+CACHE_DIR = os.environ.get(
+    "AGENT_PIPELINE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "agent_pipeline"),
+)
+MAX_CACHE_BYTES = 500 * 1024 * 1024
+
+
+def cache_key(*parts: str) -> str:
+    """Return a stable hex digest for the given string parts.
+
+    These keys only address local caches, so the much faster non-cryptographic
+    xxh3-128 is used when xxhash is installed; SHA-256 otherwise.
+    """
+    h = xxhash.xxh3_128() if XXHASH_AVAILABLE else hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Write ``data`` to ``path`` so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def touch_cache_entry(path: str) -> None:
+    """Mark ``path`` as just used, for :func:`trim_cache_dir`."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def trim_cache_dir(directory: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES) -> None:
+    """Delete least recently used files until ``directory`` fits in ``max_bytes``.
+
+    Use is tracked by mtime, which readers refresh with
+    :func:`touch_cache_entry`; atime is not updated on relatime/noatime mounts.
+    """
+    entries: List[Tuple[float, int, str]] = []
+    total = 0
+    for root, _, filenames in os.walk(directory):
+        for fname in filenames:
+            fpath = os.path.join(root, fname)
+            try:
+                st = os.stat(fpath)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fpath))
+            total += st.st_size
+    if total <= max_bytes:
+        return
+    for _, size, fpath in sorted(entries):
+        try:
+            os.remove(fpath)
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes:
+            break
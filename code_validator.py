@@ -9,12 +9,37 @@ import json
 import re
 import subprocess
 import tempfile
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from model_adapter import ModelClient
 from project_generator import ProjectStructure, ProjectFile
+
+# Faster parsing of linter and test-runner JSON reports
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 # from test_generator import TestSuite  # Commented out if not present
 
+def _load_json_report(output: str) -> Any:
+    """Parse a tool's JSON report, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(output)
+    return json.loads(output)
+
+def _write_files(root: str, files: Iterable[Tuple[str, str]]) -> None:
+    """Write (relative path, content) pairs under root, creating each directory once."""
+    created = set()
+    for rel_path, content in files:
+        file_path = os.path.join(root, rel_path)
+        directory = os.path.dirname(file_path)
+        if directory not in created:
+            os.makedirs(directory, exist_ok=True)
+            created.add(directory)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
 @dataclass
 class ValidationIssue:
     """Represents a code validation issue."""
@@ -198,7 +223,7 @@ class LinterRunner:
                     timeout=30
                 )
                 if result.stdout:
-                    flake8_output = json.loads(result.stdout)
+                    flake8_output = _load_json_report(result.stdout)
                     for item in flake8_output:
                         issues.append(ValidationIssue(
                             severity="warning" if item['code'].startswith('W') else "error",
@@ -218,7 +243,7 @@ class LinterRunner:
                     timeout=30
                 )
                 if result.stdout:
-                    pylint_output = json.loads(result.stdout)
+                    pylint_output = _load_json_report(result.stdout)
                     for item in pylint_output:
                         severity_map = {'error': 'error', 'warning': 'warning', 'info': 'info'}
                         issues.append(ValidationIssue(
@@ -239,7 +264,7 @@ class LinterRunner:
                     timeout=30
                 )
                 if result.stdout:
-                    eslint_output = json.loads(result.stdout)
+                    eslint_output = _load_json_report(result.stdout)
                     for file_result in eslint_output:
                         for message in file_result['messages']:
                             severity_map = {1: 'warning', 2: 'error'}
@@ -396,7 +421,7 @@ class TestRunner:
         
         try:
             if result.stdout:
-                data = json.loads(result.stdout)
+                data = _load_json_report(result.stdout)
                 
                 results['passed'] = data.get('numPassedTests', 0)
                 results['failed'] = data.get('numFailedTests', 0)
@@ -728,21 +753,11 @@ class CodeValidator:
     
     def _write_project_to_disk(self, project: ProjectStructure, base_path: str):
         """Write project files to disk for linting and testing."""
-        for file in project.files:
-            file_path = os.path.join(base_path, file.path)
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(file.content)
+        _write_files(base_path, ((file.path, file.content) for file in project.files))
     
     def _write_test_suite_to_disk(self, test_suite: Any, base_path: str):
         """Write test files to disk."""
-        for test_file in test_suite.test_files:
-            file_path = os.path.join(base_path, test_file.path)
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(test_file.content)
+        _write_files(base_path, ((test_file.path, test_file.content) for test_file in test_suite.test_files))
     
     def _run_linting(self, project_path: str, project: ProjectStructure) -> List[ValidationIssue]:
         """Run linting on the project."""
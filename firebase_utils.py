@@ -1,6 +1,6 @@
 import os
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, storage
 import pyrebase
 from dotenv import load_dotenv
 from datetime import datetime
@@ -225,6 +225,28 @@ def regenerate_chat_title(user_id, chat_id, model_type="gemini"):
     except Exception as e:
         return False
 
+# --- Saved RAG indexes (Firebase Storage) ---
+RAG_INDEX_EXTENSIONS = ('.faiss', '.pkl')
+
+def _chat_index_blob(user_id, chat_id, ext):
+    bucket = storage.bucket(os.getenv("FIREBASE_STORAGE_BUCKET"))
+    return bucket.blob(f"users/{user_id}/chats/{chat_id}/rag{ext}")
+
+def upload_chat_index(user_id, chat_id, store_path):
+    """Upload a chat's saved RAG index files so other hosts can restore it."""
+    for ext in RAG_INDEX_EXTENSIONS:
+        _chat_index_blob(user_id, chat_id, ext).upload_from_filename(store_path + ext)
+
+def download_chat_index(user_id, chat_id, store_path):
+    """Download a chat's RAG index files to store_path. Returns False if none was uploaded."""
+    blobs = [(_chat_index_blob(user_id, chat_id, ext), store_path + ext) for ext in RAG_INDEX_EXTENSIONS]
+    if not all(blob.exists() for blob, _ in blobs):
+        return False
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    for blob, path in blobs:
+        blob.download_to_filename(path)
+    return True
+
 # --- Legacy single-chat fallback (for migration/compatibility) ---
 def get_user_chats(user_id):
     """Legacy: get single chat history (for backward compatibility)."""
@@ -30,6 +30,50 @@ def trim_history(chat_history, max_messages=20):
     return chat_history
 
 
+def _fit_contents(contents):
+    """
+    Cut a request's contents down when they exceed Gemini's ~1M character limit,
+    which otherwise fails with a 500. File parts are truncated first; a lone
+    prompt keeps its "🚀 CRITICAL DIRECTIVE" section and is cut after it.
+    """
+    contents = list(contents)
+    # Check total content size to avoid 500 errors
+    total_chars = sum(len(str(content)) for content in contents)
+    if total_chars > 1000000:  # 1M character limit (roughly 750K tokens)
+        # Smart truncation that preserves critical prompt instructions
+        if len(contents) > 1:
+            # Keep prompt but truncate file contents more aggressively
+            prompt_content = str(contents[0])
+            truncated_files = []
+            for content in contents[1:]:
+                content_str = str(content)
+                if len(content_str) > 30000:  # More aggressive truncation for files
+                    truncated_files.append(content_str[:30000] + "\n\n[... content truncated due to size limits ...]")
+                else:
+                    truncated_files.append(content)
+            contents = [prompt_content] + truncated_files
+        else:
+            # For main prompt, preserve critical instructions at the beginning
+            prompt_str = str(contents[0])
+            if "🚀 CRITICAL DIRECTIVE" in prompt_str:
+                # Find the end of critical instructions
+                directive_end = prompt_str.find("**UPLOADED REQUIREMENTS:**") 
+                if directive_end == -1:
+                    directive_end = prompt_str.find("**PROJECT REQUEST:**")
+                if directive_end == -1:
+                    directive_end = 5000  # Fallback
+                
+                # Preserve critical instructions + reasonable amount of context
+                critical_part = prompt_str[:directive_end]
+                remaining_space = 750000 - len(critical_part)
+                context_part = prompt_str[directive_end:directive_end + remaining_space] if remaining_space > 0 else ""
+                contents[0] = critical_part + context_part + "\n\n[... prompt truncated but critical instructions preserved ...]"
+            else:
+                # Standard truncation for non-critical prompts
+                contents[0] = prompt_str[:800000] + "\n\n[... prompt truncated due to size limits ...]"
+    return contents
+
+
 def generate_gemini_response(chat_history, files=None, model_name=None, location=None):
     """
     Generate a Gemini response using google-generativeai for text, images, code/text files, and zip files.
@@ -106,41 +150,7 @@ def generate_gemini_response(chat_history, files=None, model_name=None, location
                 else:
                     contents.append(f"\n[File: {file_name}]: [Unsupported file type: {file_type}]")
         try:
-            # Check total content size to avoid 500 errors
-            total_chars = sum(len(str(content)) for content in contents)
-            if total_chars > 1000000:  # 1M character limit (roughly 750K tokens)
-                # Smart truncation that preserves critical prompt instructions
-                if len(contents) > 1:
-                    # Keep prompt but truncate file contents more aggressively
-                    prompt_content = str(contents[0])
-                    truncated_files = []
-                    for content in contents[1:]:
-                        content_str = str(content)
-                        if len(content_str) > 30000:  # More aggressive truncation for files
-                            truncated_files.append(content_str[:30000] + "\n\n[... content truncated due to size limits ...]")
-                        else:
-                            truncated_files.append(content)
-                    contents = [prompt_content] + truncated_files
-                else:
-                    # For main prompt, preserve critical instructions at the beginning
-                    prompt_str = str(contents[0])
-                    if "🚀 CRITICAL DIRECTIVE" in prompt_str:
-                        # Find the end of critical instructions
-                        directive_end = prompt_str.find("**UPLOADED REQUIREMENTS:**") 
-                        if directive_end == -1:
-                            directive_end = prompt_str.find("**PROJECT REQUEST:**")
-                        if directive_end == -1:
-                            directive_end = 5000  # Fallback
-                        
-                        # Preserve critical instructions + reasonable amount of context
-                        critical_part = prompt_str[:directive_end]
-                        remaining_space = 750000 - len(critical_part)
-                        context_part = prompt_str[directive_end:directive_end + remaining_space] if remaining_space > 0 else ""
-                        contents[0] = critical_part + context_part + "\n\n[... prompt truncated but critical instructions preserved ...]"
-                    else:
-                        # Standard truncation for non-critical prompts
-                        contents[0] = prompt_str[:800000] + "\n\n[... prompt truncated due to size limits ...]"
-            
+            contents = _fit_contents(contents)
             response = model.generate_content(contents)
         except Exception as exc:
             # More specific error handling
@@ -156,6 +166,60 @@ def generate_gemini_response(chat_history, files=None, model_name=None, location
         return f"[Unexpected error: {exc}]"
 
 
+async def generate_gemini_response_async(chat_history, model_name=None):
+    """
+    Async, text-only variant of generate_gemini_response.
+    Lets callers fan out several independent prompts concurrently.
+    """
+    try:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            return "[GOOGLE_API_KEY not set in environment.]"
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(model_name or MODEL)
+        prompt = format_history_for_gemini(trim_history(chat_history))
+        try:
+            response = await model.generate_content_async(_fit_contents([prompt]))
+        except Exception as exc:
+            error_str = str(exc)
+            if "500" in error_str or "internal error" in error_str.lower():
+                return f"[Error from Gemini: 500 Internal Error - Request may be too large. Try with smaller files or shorter prompts. Original error: {exc}]"
+            elif "quota" in error_str.lower() or "limit" in error_str.lower():
+                return f"[Error from Gemini: API quota exceeded. Please check your usage limits. Original error: {exc}]"
+            else:
+                return f"[Error from Gemini: {exc}]"
+        return response.text if hasattr(response, 'text') else str(response)
+    except Exception as exc:
+        return f"[Unexpected error: {exc}]"
+
+
+def stream_gemini_response(chat_history, model_name=None):
+    """
+    Text-only variant of generate_gemini_response that yields the reply as it is generated.
+    Errors are yielded as the same bracketed messages the blocking version returns,
+    after which the generator returns True so callers can tell a failed reply
+    from model output (yield from / StopIteration.value).
+    """
+    try:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            yield "[GOOGLE_API_KEY not set in environment.]"
+            return True
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(model_name or MODEL)
+        prompt = format_history_for_gemini(trim_history(chat_history))
+        for chunk in model.generate_content(_fit_contents([prompt]), stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # chunk without text parts (e.g. the final finish_reason chunk)
+            if text:
+                yield text
+    except Exception as exc:
+        yield f"[Error from Gemini: {exc}]"
+        return True
+
+
 def get_onboarding_prompt():
     """
     Returns the onboarding prompt for Gemini to act as a highly experienced and technically skilled Project Manager, guiding new team members through the project structure and workflow.
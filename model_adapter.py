@@ -3,6 +3,7 @@ Model Adapter for AI Agents and RAG System
 Bridges the AI agents with existing model utilities (Gemini, OpenAI, etc.)
 """
 
+import asyncio
 from typing import List, Dict, Optional
 from gemini_utils import generate_gemini_response
 from openai_utils import generate_openai_response
@@ -47,6 +48,37 @@ class ModelClient:
         except Exception as e:
             return f"Error generating response: {str(e)}"
 
+    def generate_with_kv_prefix(self, prefix_id: str, prefix_text: str, suffix_text: str) -> str:
+        """Generate a response for a prompt made of a shared prefix and a suffix.
+        
+        The hosted Gemini and OpenAI endpoints do not expose KV-cache handles,
+        so the full prompt is sent every time. Keeping ``prefix_text``
+        byte-identical and first still lets the providers' automatic prompt
+        caching skip prefill for it. ``prefix_id`` names the prefix so a
+        backend with explicit prefix caching can be added here.
+        """
+        return self.generate_response(prefix_text + suffix_text)
+    
+    async def agenerate_response(self, prompt: str, files: Optional[List[Dict]] = None) -> str:
+        """Async variant of generate_response that runs the call in a worker thread."""
+        return await asyncio.to_thread(self.generate_response, prompt, files)
+
+# Starts of the failure messages gemini_utils, openai_utils and ModelClient
+# return in place of model output
+ERROR_RESPONSE_PREFIXES = (
+    "Error generating response:",
+    "[Error from ",
+    "[Error generating ",
+    "[Unexpected error",
+    "[OpenAI ",
+    "[GOOGLE_API_KEY ",
+    "[OPENAI_API_KEY ",
+)
+
+def is_error_response(response: str) -> bool:
+    """Return True if ``response`` is an error message rather than model output."""
+    return response.startswith(ERROR_RESPONSE_PREFIXES)
+
 # Utility functions for Streamlit integration
 def extract_files_from_uploaded(uploaded_files) -> Dict[str, str]:
     """Extract content from Streamlit uploaded files including Word documents."""
@@ -184,6 +184,93 @@ def generate_openai_response(chat_history, files=None, model_name=None, location
         return f"[Unexpected error: {exc}]"
 
 
+async def generate_openai_response_async(chat_history, model_name=None):
+    """
+    Async, text-only variant of generate_openai_response.
+    Lets callers fan out several independent prompts concurrently.
+    """
+    try:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return "[OPENAI_API_KEY not set in environment.]"
+
+        messages = [{"role": "system", "content": get_onboarding_prompt()}]
+        messages.extend(format_history_for_openai(trim_history(chat_history)))
+
+        try:
+            async with openai.AsyncOpenAI(api_key=api_key) as client:
+                response = await client.chat.completions.create(
+                    model=model_name or DEFAULT_MODEL,
+                    messages=messages,
+                    max_tokens=4000,
+                    temperature=0.7
+                )
+            return response.choices[0].message.content
+        except openai.RateLimitError:
+            return ("[OpenAI Rate Limited] You've exceeded the rate limit for OpenAI API. "
+                   "Please wait a moment and try again, or consider upgrading your plan.")
+        except openai.AuthenticationError:
+            return ("[OpenAI Authentication Error] Your API key is invalid or expired. "
+                   "Please check your OPENAI_API_KEY in the .env file.")
+        except openai.PermissionDeniedError:
+            return ("[OpenAI Access Forbidden] Your account doesn't have access to this model or feature. "
+                   "Please check your OpenAI account permissions.")
+        except openai.APIError as exc:
+            return f"[Error from OpenAI: {exc}]"
+
+    except Exception as exc:
+        return f"[Unexpected error: {exc}]"
+
+
+def stream_openai_response(chat_history, model_name=None):
+    """
+    Text-only variant of generate_openai_response that yields the reply as it is generated.
+    Errors are yielded as the same bracketed messages the blocking version returns,
+    after which the generator returns True so callers can tell a failed reply
+    from model output (yield from / StopIteration.value).
+    """
+    try:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            yield "[OPENAI_API_KEY not set in environment.]"
+            return True
+
+        client = openai.OpenAI(api_key=api_key)
+        messages = [{"role": "system", "content": get_onboarding_prompt()}]
+        messages.extend(format_history_for_openai(trim_history(chat_history)))
+
+        try:
+            stream = client.chat.completions.create(
+                model=model_name or DEFAULT_MODEL,
+                messages=messages,
+                max_tokens=4000,
+                temperature=0.7,
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except openai.RateLimitError:
+            yield ("[OpenAI Rate Limited] You've exceeded the rate limit for OpenAI API. "
+                   "Please wait a moment and try again, or consider upgrading your plan.")
+            return True
+        except openai.AuthenticationError:
+            yield ("[OpenAI Authentication Error] Your API key is invalid or expired. "
+                   "Please check your OPENAI_API_KEY in the .env file.")
+            return True
+        except openai.PermissionDeniedError:
+            yield ("[OpenAI Access Forbidden] Your account doesn't have access to this model or feature. "
+                   "Please check your OpenAI account permissions.")
+            return True
+        except openai.APIError as exc:
+            yield f"[Error from OpenAI: {exc}]"
+            return True
+
+    except Exception as exc:
+        yield f"[Unexpected error: {exc}]"
+        return True
+
+
 def get_onboarding_prompt():
     """
     Returns the onboarding prompt for OpenAI to act as a highly experienced and technically skilled Project Manager, guiding new team members through the project structure and workflow.
@@ -4,8 +4,9 @@ Coordinates the full pipeline: project generation -> validation -> fixes
 """
 
 import json
+import os
 import zipfile
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, BinaryIO, Iterator, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from io import BytesIO
@@ -16,6 +17,12 @@ from project_generator import ProjectGenerator, ProjectStructure, ProjectFile
 # from test_generator import TestGenerator, TestSuite
 from code_validator import CodeValidator, ValidationResult
 
+# File types that are already compressed; deflating them again wastes CPU.
+PRECOMPRESSED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.zip', '.gz', '.tgz',
+    '.bz2', '.xz', '.7z', '.jar', '.whl', '.woff', '.woff2', '.mp3', '.mp4', '.pdf'
+}
+
 
 @dataclass
 class GenerationOptions:
@@ -464,29 +471,47 @@ Provide complete, runnable JavaScript code with comments.
         """Export the generated project as a ZIP file."""
         
         zip_buffer = BytesIO()
+        self.export_project_to_stream(result, zip_buffer, include_reports)
+        return zip_buffer.getvalue()
+    
+    def iter_files(self, result: GenerationResult,
+                   include_reports: bool = True) -> Iterator[Tuple[str, str]]:
+        """Yield ``(path, content)`` for every file in the exported project."""
         
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Add all project files
-            for file in result.generated_files:
-                zip_file.writestr(file.path, file.content)
-            
-            # Add reports if requested
-            if include_reports and result.validation_result:
-                # Add validation report
-                validation_report = self.code_validator.generate_validation_report(
-                    result.validation_result
-                )
-                zip_file.writestr("VALIDATION_REPORT.md", validation_report)
-            
-            # Add generation summary
-            zip_file.writestr("GENERATION_SUMMARY.md", result.summary)
-            
-            # Add project metadata
-            metadata = self._generate_project_metadata(result)
-            zip_file.writestr("project_metadata.json", json.dumps(metadata, indent=2))
+        # Add all project files
+        for file in result.generated_files:
+            yield file.path, file.content
+        
+        # Add reports if requested
+        if include_reports and result.validation_result:
+            # Add validation report
+            validation_report = self.code_validator.generate_validation_report(
+                result.validation_result
+            )
+            yield "VALIDATION_REPORT.md", validation_report
         
-        zip_buffer.seek(0)
-        return zip_buffer.read()
+        # Add generation summary
+        yield "GENERATION_SUMMARY.md", result.summary
+        
+        # Add project metadata
+        metadata = self._generate_project_metadata(result)
+        yield "project_metadata.json", json.dumps(metadata, indent=2)
+    
+    def export_project_to_stream(self, result: GenerationResult, fileobj: BinaryIO,
+                                 include_reports: bool = True) -> None:
+        """Write the generated project as a ZIP archive to ``fileobj``.
+        
+        Entries are compressed and written one at a time, so the archive never
+        has to be held in memory as a whole. Already-compressed assets are
+        stored as-is instead of being deflated again.
+        """
+        
+        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as zip_file:
+            for path, content in self.iter_files(result, include_reports):
+                ext = os.path.splitext(path)[1].lower()
+                compress_type = (zipfile.ZIP_STORED if ext in PRECOMPRESSED_EXTENSIONS
+                                 else zipfile.ZIP_DEFLATED)
+                zip_file.writestr(path, content, compress_type=compress_type)
     
     def _generate_project_metadata(self, result: GenerationResult) -> Dict[str, Any]:
         """Generate metadata about the project."""
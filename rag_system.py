@@ -7,13 +7,84 @@ for uploaded project files.
 import os
 import hashlib
 import json
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
-import faiss  # type: ignore
+try:
+    import faiss  # type: ignore
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
 import pickle
+from io import BytesIO
+
+from cache_utils import atomic_write_bytes, cache_key
+
+# Candidates fetched per requested result before float32 rescoring of binary codes
+RESCORE_OVERSAMPLE = 4
+# Float indexes larger than this are rebuilt as IVF-PQ instead of an exhaustive scan
+IVF_THRESHOLD = 4096
+IVF_PQ_SUBQUANTIZERS = 8
+DEFAULT_NPROBE = 16
+
+# "onnx" runs CPU-only hosts on the int8-quantised ONNX export (needs optimum[onnxruntime])
+EMBEDDING_BACKEND = os.environ.get("RAG_EMBEDDING_BACKEND", "torch")
+ONNX_QUANTIZED_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+EMBED_BATCH_SIZE = 128
+
+_EMBEDDING_MODELS: Dict[str, SentenceTransformer] = {}
+_EMBEDDING_MODELS_LOCK = threading.Lock()
+
+
+def _load_embedding_model(model_name: str) -> SentenceTransformer:
+    """Load ``model_name`` on the fastest backend available."""
+    if torch.cuda.is_available():
+        return SentenceTransformer(model_name, device="cuda")
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            return SentenceTransformer(model_name, device="cpu", backend="onnx",
+                                       model_kwargs={"file_name": ONNX_QUANTIZED_FILE})
+        except Exception:
+            pass  # ONNX runtime or export missing; use the regular model
+    return SentenceTransformer(model_name)
+
+
+def get_embedding_model(model_name: str = "all-MiniLM-L6-v2") -> SentenceTransformer:
+    """Return a shared embedding model, loading it on first use.
+
+    Loading a SentenceTransformer takes seconds, so every VectorStore in the
+    process reuses the same instance. Safe to call from a background thread
+    to warm the model up ahead of indexing.
+    """
+    with _EMBEDDING_MODELS_LOCK:
+        model = _EMBEDDING_MODELS.get(model_name)
+        if model is None:
+            model = _load_embedding_model(model_name)
+            _EMBEDDING_MODELS[model_name] = model
+        return model
+
+
+def deduplicate_files(files_content: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """Collapse files with identical content before indexing.
+
+    Returns the unique files (keyed by the first path in sorted order) and a
+    map from each kept path to every path sharing its content.
+    """
+    by_hash: Dict[str, List[str]] = {}
+    for path in sorted(files_content):
+        by_hash.setdefault(cache_key(files_content[path]), []).append(path)
+
+    unique_files = {}
+    aliases = {}
+    for paths in by_hash.values():
+        unique_files[paths[0]] = files_content[paths[0]]
+        aliases[paths[0]] = paths
+    return unique_files, aliases
 
 
 @dataclass
@@ -333,13 +404,79 @@ class ProjectFileProcessor:
             chunk_id=chunk_id
         )
 
-class VectorStore:
-    """Vector storage and similarity search using FAISS."""
+class EmbeddingCache:
+    """On-disk cache of chunk embeddings keyed by a hash of the chunk text."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, model_name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, model_name, key[:2], f"{key}.npy")
+
+    def get(self, model_name: str, content: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for ``content`` or None."""
+        try:
+            return np.load(self._path(model_name, cache_key(content)))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, model_name: str, content: str, embedding: np.ndarray):
+        """Store the embedding for ``content``."""
+        buffer = BytesIO()
+        np.save(buffer, embedding)
+        try:
+            atomic_write_bytes(self._path(model_name, cache_key(content)), buffer.getvalue())
+        except OSError:
+            pass
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+
+class NumpyFlatIndex:
+    """Exact inner-product index used when FAISS isn't installed.
+
+    Mirrors the small part of the FAISS index API that VectorStore uses.
+    Vectors are expected to be L2-normalised, so scores are cosine similarities.
+    """
+
+    def __init__(self, dimension: int, vectors: Optional[np.ndarray] = None):
+        self.dimension = dimension
+        self.vectors = np.zeros((0, dimension), dtype='float32') if vectors is None else vectors
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.vectors)
+
+    def add(self, vectors: np.ndarray):
+        self.vectors = np.vstack([self.vectors, np.asarray(vectors, dtype='float32')])
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = queries @ self.vectors.T
+        k = min(k, self.ntotal)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+class VectorStore:
+    """Vector storage and similarity search using FAISS.
+
+    With ``quantization="binary"`` the index holds 1-bit sign codes searched
+    by Hamming distance; the ``RESCORE_OVERSAMPLE * k`` nearest codes are then
+    re-ranked with the float16 embeddings kept on each chunk. Float stores
+    switch from an exact ``IndexFlatIP`` to a trained ``IndexIVFPQ`` once they
+    hold more than ``IVF_THRESHOLD`` vectors, and are rescored the same way.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2",
+                 embedding_cache: Optional[EmbeddingCache] = None,
+                 quantization: str = "float"):
+        self.model_name = model_name
+        self.embedding_cache = embedding_cache
+        self.model = get_embedding_model(model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
-        self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
+        # Binary codes and IVF need FAISS; the NumPy fallback is always exact float search
+        self.quantization = quantization if FAISS_AVAILABLE else "float"
+        self.index = self._new_index()
         self.chunks: List[DocumentChunk] = []
         self.metadata_store: Dict[str, DocumentChunk] = {}
 
@@ -350,19 +487,102 @@ class VectorStore:
 
         # Generate embeddings
         contents = [chunk.content for chunk in chunks]
-        embeddings = self.model.encode(contents, normalize_embeddings=True)
+        embeddings_float32 = self._embed(contents)
         # Add to FAISS index
-        embeddings_float32 = embeddings.astype('float32')
-        self.index.add(embeddings_float32)
+        if self.quantization == "binary":
+            self.index.add(np.packbits(embeddings_float32 > 0, axis=1))
+        else:
+            self.index.add(embeddings_float32)
 
-        # Store chunks and metadata 
-        for chunk, embedding in zip(chunks, embeddings_float32):
+        # Store chunks and metadata; half precision is plenty for rescoring
+        for chunk, embedding in zip(chunks, embeddings_float32.astype(np.float16)):
             chunk.embedding = embedding
             self.chunks.append(chunk)
             self.metadata_store[chunk.chunk_id] = chunk
 
-    def search(self, query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
-        """Search for similar chunks using semantic similarity."""
+        if (FAISS_AVAILABLE and self.quantization != "binary" and self.index.ntotal > IVF_THRESHOLD
+                and not isinstance(self.index, faiss.IndexIVF)
+                and self.dimension % IVF_PQ_SUBQUANTIZERS == 0):
+            self._build_ivf_index()
+
+    def _build_ivf_index(self):
+        """Replace the exhaustive index with an IVF-PQ index trained on all chunks."""
+        embeddings = np.stack([chunk.embedding for chunk in self.chunks]).astype('float32')
+        nlist = int(4 * np.sqrt(len(embeddings)))
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, IVF_PQ_SUBQUANTIZERS, 8,
+                                 faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+        index.add(embeddings)
+        index.nprobe = DEFAULT_NPROBE
+        self.index = index
+
+    def _new_index(self):
+        if not FAISS_AVAILABLE:
+            return NumpyFlatIndex(self.dimension)
+        if self.quantization == "binary":
+            return faiss.IndexBinaryFlat(self.dimension)
+        return faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
+
+    def _search_index(self, query_embedding: np.ndarray, k: int,
+                      nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return cosine scores and chunk indices of the ``k`` best matches."""
+        k_candidates = min(k * RESCORE_OVERSAMPLE, self.index.ntotal)
+        if self.quantization == "binary":
+            codes = np.packbits(query_embedding > 0, axis=1)
+            _, candidates = self.index.search(codes, k_candidates)
+        elif FAISS_AVAILABLE and isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = nprobe or DEFAULT_NPROBE
+            _, candidates = self.index.search(query_embedding, k_candidates)
+        else:
+            scores, indices = self.index.search(query_embedding, k)
+            return scores[0], indices[0]
+
+        candidates = candidates[0][candidates[0] >= 0]
+        if len(candidates) == 0:
+            return np.zeros(0, dtype='float32'), candidates
+        vectors = np.stack([self.chunks[i].embedding for i in candidates]).astype('float32')
+        scores = vectors @ query_embedding[0]
+        order = np.argsort(-scores)[:k]
+        return scores[order], candidates[order]
+
+    def _embed(self, contents: List[str]) -> np.ndarray:
+        """Embed ``contents``, only encoding texts missing from the cache."""
+        # Identical chunks (license headers, boilerplate) are encoded once
+        unique_texts = list(dict.fromkeys(contents))
+        if len(unique_texts) < len(contents):
+            position = {text: i for i, text in enumerate(unique_texts)}
+            return self._embed(unique_texts)[[position[text] for text in contents]]
+
+        if self.embedding_cache is None:
+            return self.model.encode(contents, batch_size=EMBED_BATCH_SIZE, show_progress_bar=False,
+                                     normalize_embeddings=True).astype('float32')
+
+        embeddings = np.zeros((len(contents), self.dimension), dtype='float32')
+        missing = []
+        for i, content in enumerate(contents):
+            cached = self.embedding_cache.get(self.model_name, content)
+            if cached is not None and cached.shape == (self.dimension,):
+                embeddings[i] = cached
+            else:
+                missing.append(i)
+
+        if missing:
+            encoded = self.model.encode([contents[i] for i in missing], batch_size=EMBED_BATCH_SIZE,
+                                        show_progress_bar=False,
+                                        normalize_embeddings=True).astype('float32')
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+                self.embedding_cache.put(self.model_name, contents[i], embedding)
+        return embeddings
+
+    def search(self, query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None,
+               nprobe: Optional[int] = None) -> List[SearchResult]:
+        """Search for similar chunks using semantic similarity.
+
+        ``nprobe`` sets how many IVF lists are scanned once the store uses an
+        IVF index (more is slower but has better recall).
+        """
         if self.index.ntotal == 0:
             return []
         # Generate query embedding
@@ -372,9 +592,9 @@ class VectorStore:
             query_embedding = query_embedding.reshape(1, -1)
         # Search in FAISS with proper parameters
         k_search = min(k, self.index.ntotal)  # Ensure k doesn't exceed available vectors
-        scores, indices = self.index.search(query_embedding, k_search)
+        scores, indices = self._search_index(query_embedding, k_search, nprobe)
         results = []
-        for score, idx in zip(scores[0], indices[0]):
+        for score, idx in zip(scores, indices):
             if idx < len(self.chunks):
                 chunk = self.chunks[idx]
                 # Apply filters if provided
@@ -403,34 +623,154 @@ class VectorStore:
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
         # Save FAISS index
-        faiss.write_index(self.index, f"{filepath}.faiss")
+        if isinstance(self.index, NumpyFlatIndex):
+            with open(f"{filepath}.faiss", 'wb') as f:
+                np.save(f, self.index.vectors)
+        elif self.quantization == "binary":
+            faiss.write_index_binary(self.index, f"{filepath}.faiss")
+        else:
+            faiss.write_index(self.index, f"{filepath}.faiss")
 
         # Save chunks and metadata
         with open(f"{filepath}.pkl", 'wb') as f:
             pickle.dump({
                 'chunks': self.chunks,
                 'metadata_store': self.metadata_store,
-                'dimension': self.dimension
+                'dimension': self.dimension,
+                'quantization': self.quantization,
+                'index_backend': 'faiss' if FAISS_AVAILABLE else 'numpy'
             }, f)
 
-    def load(self, filepath: str):
-        """Load the vector store from disk."""
-        if os.path.exists(f"{filepath}.faiss") and os.path.exists(f"{filepath}.pkl"):
-            # Load FAISS index
-            self.index = faiss.read_index(f"{filepath}.faiss")
+    def load(self, filepath: str, mmap: bool = False):
+        """Load the vector store from disk.
 
+        With ``mmap`` the FAISS index is memory-mapped read-only where the
+        index type supports it, instead of being read into memory.
+        """
+        if os.path.exists(f"{filepath}.faiss") and os.path.exists(f"{filepath}.pkl"):
             # Load chunks and metadata
             with open(f"{filepath}.pkl", 'rb') as f:
                 data = pickle.load(f)
                 self.chunks = data['chunks']
                 self.metadata_store = data['metadata_store']
                 self.dimension = data['dimension']
+                self.quantization = data.get('quantization', 'float')
+
+            # Load FAISS index
+            if not FAISS_AVAILABLE:
+                # Rebuild from the stored chunk embeddings, whichever backend saved them
+                self.quantization = "float"
+                vectors = (np.stack([chunk.embedding for chunk in self.chunks]).astype('float32')
+                           if self.chunks else None)
+                self.index = NumpyFlatIndex(self.dimension, vectors)
+            elif data.get('index_backend') == 'numpy':
+                self.index = self._new_index()
+                if self.chunks:
+                    self.index.add(np.stack([chunk.embedding for chunk in self.chunks]).astype('float32'))
+            else:
+                reader = faiss.read_index_binary if self.quantization == "binary" else faiss.read_index
+                self.index = None
+                if mmap:
+                    try:
+                        self.index = reader(f"{filepath}.faiss", faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                    except RuntimeError:
+                        pass  # index type can't be mapped
+                if self.index is None:
+                    self.index = reader(f"{filepath}.faiss")
+
+class SemanticCache:
+    """Approximate cache keyed by embedding similarity.
+
+    Candidate entries are found with random-projection LSH (several hash
+    tables of sign bits) and then verified with an exact cosine similarity
+    check, so only near-duplicate queries are treated as hits. Vectors are
+    expected to be L2-normalised.
+    """
+
+    def __init__(self, dimension: int, threshold: float = 0.95, nbits: int = 16,
+                 num_tables: int = 4, ttl: Optional[float] = None, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((num_tables, nbits, dimension)).astype('float32')
+        self.threshold = threshold
+        self.ttl = ttl
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(num_tables)]
+        self.entries: Dict[int, Tuple[np.ndarray, Any, float]] = {}
+        self._next_id = 0
+        self._bit_weights = 1 << np.arange(nbits, dtype=np.int64)
+
+    def _signatures(self, vector: np.ndarray) -> List[int]:
+        bits = (self.planes @ vector) > 0
+        return [int(sig) for sig in bits.astype(np.int64) @ self._bit_weights]
+
+    def get(self, vector: np.ndarray) -> Optional[Any]:
+        """Return the value stored for the most similar cached vector, if any."""
+        vector = np.asarray(vector, dtype='float32')
+        now = time.time()
+        best_value, best_score = None, self.threshold
+        seen = set()
+        for table, sig in zip(self.tables, self._signatures(vector)):
+            for entry_id in table.get(sig, ()):
+                if entry_id in seen or entry_id not in self.entries:
+                    continue
+                seen.add(entry_id)
+                key, value, created_at = self.entries[entry_id]
+                if self.ttl is not None and now - created_at > self.ttl:
+                    continue
+                score = float(np.dot(key, vector))
+                if score >= best_score:
+                    best_value, best_score = value, score
+        return best_value
+
+    def put(self, vector: np.ndarray, value: Any):
+        """Cache ``value`` under ``vector``."""
+        vector = np.asarray(vector, dtype='float32')
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = (vector, value, time.time())
+        for table, sig in zip(self.tables, self._signatures(vector)):
+            table.setdefault(sig, []).append(entry_id)
+
+    def prune(self):
+        """Drop expired entries."""
+        if self.ttl is None:
+            return
+        cutoff = time.time() - self.ttl
+        expired = {i for i, (_, _, created_at) in self.entries.items() if created_at < cutoff}
+        if not expired:
+            return
+        for entry_id in expired:
+            del self.entries[entry_id]
+        for table in self.tables:
+            for sig in list(table):
+                table[sig] = [i for i in table[sig] if i not in expired]
+                if not table[sig]:
+                    del table[sig]
+
+    def save(self, filepath: str):
+        """Persist the cache to disk."""
+        self.prune()
+        atomic_write_bytes(filepath, pickle.dumps(self, pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def load(filepath: str) -> Optional['SemanticCache']:
+        """Load a cache saved with ``save``, or None if unavailable."""
+        try:
+            with open(filepath, 'rb') as f:
+                cache = pickle.load(f)
+        except Exception:
+            return None
+        return cache if isinstance(cache, SemanticCache) else None
+
 
 class ProjectRAG:
     """Main RAG system for project analysis."""
 
-    def __init__(self, storage_dir: str = "./rag_storage"):
+    def __init__(self, storage_dir: str = "./rag_storage",
+                 embedding_cache: Optional[EmbeddingCache] = None,
+                 quantization: str = "float"):
         self.storage_dir = storage_dir
+        self.embedding_cache = embedding_cache
+        self.quantization = quantization
         self.processor = ProjectFileProcessor()
         self.vector_stores: Dict[str, VectorStore] = {}  # project_id -> VectorStore
         os.makedirs(storage_dir, exist_ok=True)
@@ -442,7 +782,7 @@ class ProjectRAG:
 
         # Create or load vector store for this project
         store_key = f"{user_id}_{project_id}"
-        vector_store = VectorStore()
+        vector_store = VectorStore(embedding_cache=self.embedding_cache, quantization=self.quantization)
 
         # Load existing index if available
         store_path = os.path.join(self.storage_dir, store_key)
@@ -460,14 +800,37 @@ class ProjectRAG:
 
         return len(chunks)
 
+    def store_path(self, user_id: str, project_id: str) -> str:
+        """Return the path prefix of a project's saved ``.faiss``/``.pkl`` files."""
+        return os.path.join(self.storage_dir, f"{user_id}_{project_id}")
+
+    def load_project(self, user_id: str, project_id: str, mmap: bool = False) -> bool:
+        """Load a previously saved project index into memory.
+
+        Returns False if no saved index exists for the project.
+        """
+        store_key = f"{user_id}_{project_id}"
+        if store_key in self.vector_stores:
+            return True
+
+        store_path = self.store_path(user_id, project_id)
+        if not (os.path.exists(f"{store_path}.faiss") and os.path.exists(f"{store_path}.pkl")):
+            return False
+
+        vector_store = VectorStore(embedding_cache=self.embedding_cache, quantization=self.quantization)
+        vector_store.load(store_path, mmap=mmap)
+        self.vector_stores[store_key] = vector_store
+        return True
+
     def search_project(self, user_id: str, project_id: str, query: str,
-                      k: int = 5, file_types: Optional[List[str]] = None) -> List[SearchResult]:
+                      k: int = 5, file_types: Optional[List[str]] = None,
+                      nprobe: Optional[int] = None) -> List[SearchResult]:
         """Search within a specific project."""
         store_key = f"{user_id}_{project_id}"
 
         # Load vector store if not in memory
         if store_key not in self.vector_stores:
-            vector_store = VectorStore()
+            vector_store = VectorStore(embedding_cache=self.embedding_cache, quantization=self.quantization)
             store_path = os.path.join(self.storage_dir, store_key)
             if os.path.exists(f"{store_path}.faiss"):
                 vector_store.load(store_path)
@@ -482,7 +845,7 @@ class ProjectRAG:
         if file_types is not None:
             filters['type'] = file_types
 
-        return vector_store.search(query, k, filters)
+        return vector_store.search(query, k, filters, nprobe=nprobe)
 
     def get_relevant_context(self, user_id: str, project_id: str, query: str,
                            max_chunks: int = 3) -> str:
@@ -536,7 +899,7 @@ Content:
             "total_chunks": len(chunks),
             "total_lines": total_lines,
             "file_types": file_types,
-            "files": list(files),
+            "files": sorted(files),
             "indexed_at": datetime.now().isoformat()
         }
 
@@ -560,9 +923,10 @@ Content:
         """Simplified method to index project files (wrapper for index_project)."""
         return self.index_project(user_id, project_id, files_content)
 
-    def search_similar_code(self, query: str, top_k: int = 5, user_id: str = "default", project_id: str = "current"):
+    def search_similar_code(self, query: str, top_k: int = 5, user_id: str = "default", project_id: str = "current",
+                            nprobe: Optional[int] = None):
         """Simplified method to search for similar code (wrapper for search_project)."""
-        results = self.search_project(user_id, project_id, query, k=top_k)
+        results = self.search_project(user_id, project_id, query, k=top_k, nprobe=nprobe)
 
         # Convert to the format expected by the app
         formatted_results = []
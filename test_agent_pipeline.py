@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script for the agent_pipeline command-line helpers.
+"""
+
+import sys
+import os
+import tempfile
+import zipfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def _make_project(root):
+    """Create a small project tree under ``root``."""
+    os.makedirs(os.path.join(root, "src"))
+    with open(os.path.join(root, "src", "main.py"), "w") as f:
+        f.write("print('hello')\n")
+    with open(os.path.join(root, "README.md"), "w") as f:
+        f.write("# Demo\n")
+
+def test_load_files_directory_and_zip():
+    """Test that directories and zip archives load the same files."""
+    print("🧪 Testing load_files...")
+
+    from agent_pipeline import load_files
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = os.path.join(tmp, "project")
+        _make_project(project)
+
+        archive = os.path.join(tmp, "project.zip")
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.write(os.path.join(project, "src", "main.py"), "src/main.py")
+            zf.write(os.path.join(project, "README.md"), "README.md")
+
+        from_dir = load_files(project, use_cache=False)
+        from_zip = load_files(archive, use_cache=False)
+
+    expected = {
+        os.path.join("src", "main.py"): "print('hello')\n",
+        "README.md": "# Demo\n",
+    }
+    assert from_dir == expected
+    assert from_zip == {"src/main.py": "print('hello')\n", "README.md": "# Demo\n"}
+    print("✅ load_files works for directories and zip archives")
+
+def test_load_files_skips_binary_and_vendor_files():
+    """Test that binaries, oversized files and vendored dirs are skipped."""
+    print("🧪 Testing load_files filtering...")
+
+    from agent_pipeline import load_files, MAX_BYTES
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _make_project(tmp)
+        os.makedirs(os.path.join(tmp, "node_modules", "lib"))
+        with open(os.path.join(tmp, "node_modules", "lib", "index.js"), "w") as f:
+            f.write("module.exports = {};\n")
+        with open(os.path.join(tmp, "logo.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n")
+        with open(os.path.join(tmp, "big.txt"), "w") as f:
+            f.write("x" * (MAX_BYTES + 1))
+
+        files = load_files(tmp, use_cache=False)
+
+    assert sorted(files) == sorted([os.path.join("src", "main.py"), "README.md"])
+    print("✅ load_files skips binary, oversized and vendored files")
+
+def test_load_files_cache_invalidation():
+    """Test that cached loads pick up edits to the project."""
+    print("🧪 Testing load_files cache...")
+
+    import agent_pipeline
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = os.path.join(tmp, "project")
+        _make_project(project)
+        original_cache_dir = agent_pipeline.CACHE_DIR
+        agent_pipeline.CACHE_DIR = os.path.join(tmp, "cache")
+        try:
+            first = agent_pipeline.load_files(project)
+            cached = agent_pipeline.load_files(project)
+            with open(os.path.join(project, "README.md"), "a") as f:
+                f.write("More docs\n")
+            edited = agent_pipeline.load_files(project)
+        finally:
+            agent_pipeline.CACHE_DIR = original_cache_dir
+
+    assert cached == first
+    assert edited["README.md"] == "# Demo\nMore docs\n"
+    print("✅ load_files cache is invalidated by edits")
+
+def test_trim_cache_dir_evicts_by_mtime():
+    """Test that cache trimming drops the least recently used entries by mtime."""
+    print("🧪 Testing trim_cache_dir...")
+
+    import agent_pipeline
+    from cache_utils import trim_cache_dir
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "cache")
+        os.makedirs(cache)
+        for i, name in enumerate(["old", "mid", "new"]):
+            path = os.path.join(cache, name)
+            with open(path, "wb") as f:
+                f.write(b"x" * 10)
+            # Reads don't reliably bump atime, so a stale atime must not matter
+            os.utime(path, (0, 1000 + i))
+        trim_cache_dir(cache, max_bytes=20)
+        remaining = sorted(os.listdir(cache))
+
+        project = os.path.join(tmp, "project")
+        _make_project(project)
+        original_cache_dir = agent_pipeline.CACHE_DIR
+        agent_pipeline.CACHE_DIR = cache
+        try:
+            agent_pipeline.load_files(project)
+            files_dir = os.path.join(cache, "files")
+            (entry,) = os.listdir(files_dir)
+            entry = os.path.join(files_dir, entry)
+            os.utime(entry, (0, 1000))
+            agent_pipeline.load_files(project)
+            touched = os.stat(entry).st_mtime
+        finally:
+            agent_pipeline.CACHE_DIR = original_cache_dir
+
+    assert remaining == ["mid", "new"]
+    assert touched > 1000
+    print("✅ trim_cache_dir evicts by mtime and cache hits are touched")
+
+def test_cached_generate_skips_error_responses():
+    """Test that provider errors are neither cached nor replayed from the cache."""
+    print("🧪 Testing cached_generate with error responses...")
+
+    import asyncio
+    import agent_pipeline
+
+    rate_limited = ("[OpenAI Rate Limited] You've exceeded the rate limit for OpenAI API. "
+                    "Please wait a moment and try again, or consider upgrading your plan.")
+
+    class FakeModel:
+        model_name = "gpt-4o"
+
+        def __init__(self, reply):
+            self.reply = reply
+            self.calls = 0
+
+        async def agenerate_response(self, prompt):
+            self.calls += 1
+            return self.reply
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original_cache_dir = agent_pipeline.CACHE_DIR
+        agent_pipeline.CACHE_DIR = tmp
+        try:
+            failing = FakeModel(rate_limited)
+            asyncio.run(agent_pipeline.cached_generate(failing, "prompt"))
+            asyncio.run(agent_pipeline.cached_generate(failing, "prompt"))
+            written = [f for _, _, files in os.walk(tmp) for f in files]
+
+            # An error cached before it was recognised is treated as a miss
+            key = agent_pipeline.cache_key("gpt-4o", "prompt")
+            path = os.path.join(tmp, "llm", key[:2], f"{key}.txt")
+            os.makedirs(os.path.dirname(path))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(rate_limited)
+            working = FakeModel("print('hello')")
+            answer = asyncio.run(agent_pipeline.cached_generate(working, "prompt"))
+        finally:
+            agent_pipeline.CACHE_DIR = original_cache_dir
+
+    assert failing.calls == 2
+    assert written == []
+    assert answer == "print('hello')" and working.calls == 1
+    print("✅ cached_generate never stores or replays errors")
+
+if __name__ == "__main__":
+    test_load_files_directory_and_zip()
+    test_load_files_skips_binary_and_vendor_files()
+    test_load_files_cache_invalidation()
+    test_trim_cache_dir_evicts_by_mtime()
+    test_cached_generate_skips_error_responses()
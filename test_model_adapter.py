@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script for the model adapter's error-response detection.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Every failure message gemini_utils, openai_utils and ModelClient can return
+PROVIDER_ERRORS = [
+    "[GOOGLE_API_KEY not set in environment.]",
+    "[Error from Gemini: 500 Internal Error - Request may be too large. Try with smaller files or shorter prompts. Original error: boom]",
+    "[Error from Gemini: API quota exceeded. Please check your usage limits. Original error: boom]",
+    "[Error from Gemini: boom]",
+    "[Error generating image: boom]",
+    "[OPENAI_API_KEY not set in environment.]",
+    "[OpenAI Rate Limited] You've exceeded the rate limit for OpenAI API. "
+    "Please wait a moment and try again, or consider upgrading your plan.",
+    "[OpenAI Authentication Error] Your API key is invalid or expired. "
+    "Please check your OPENAI_API_KEY in the .env file.",
+    "[OpenAI Access Forbidden] Your account doesn't have access to this model or feature. "
+    "Please check your OpenAI account permissions.",
+    "[OpenAI Quota Exceeded] You've reached your OpenAI API quota limit. "
+    "Please add payment information or upgrade your plan at https://platform.openai.com/.",
+    "[Error from OpenAI: boom]",
+    "[Unexpected error: boom]",
+    "Error generating response: boom",
+]
+
+def test_is_error_response_detects_provider_errors():
+    """Test that every provider failure message is recognised."""
+    print("🧪 Testing is_error_response on provider errors...")
+
+    from model_adapter import is_error_response
+
+    for message in PROVIDER_ERRORS:
+        assert is_error_response(message), message
+    print("✅ All provider error messages are detected")
+
+def test_is_error_response_accepts_model_output():
+    """Test that ordinary answers, including bracketed ones, are not errors."""
+    print("🧪 Testing is_error_response on model output...")
+
+    from model_adapter import is_error_response
+
+    for answer in [
+        "Here is your code:\n```python\nprint('hi')\n```",
+        "[1, 2, 3]",
+        "[See the docs](https://example.com) for error handling.",
+        "Partial answer...[Error from Gemini: boom]",
+        "",
+    ]:
+        assert not is_error_response(answer), answer
+    print("✅ Model output is not mistaken for an error")
+
+def test_stream_helpers_flag_errors():
+    """Test that the stream helpers return True after yielding an error."""
+    print("🧪 Testing stream error flag...")
+
+    from gemini_utils import stream_gemini_response
+    from openai_utils import stream_openai_response
+
+    saved = {name: os.environ.pop(name, None) for name in ("GOOGLE_API_KEY", "OPENAI_API_KEY")}
+    try:
+        for stream in (stream_gemini_response([{"role": "user", "content": "hi"}]),
+                       stream_openai_response([{"role": "user", "content": "hi"}])):
+            parts = []
+            try:
+                while True:
+                    parts.append(next(stream))
+            except StopIteration as stop:
+                failed = stop.value
+            assert failed is True
+            assert len(parts) == 1 and parts[0].endswith("not set in environment.]")
+    finally:
+        for name, value in saved.items():
+            if value is not None:
+                os.environ[name] = value
+    print("✅ Stream helpers report failures out of band")
+
+def test_stream_flags_error_after_partial_output():
+    """Test that a failure after some text is still reported as an error."""
+    print("🧪 Testing mid-stream error flag...")
+
+    import types
+    import gemini_utils
+
+    class FakeModel:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, prompt, stream=False):
+            yield types.SimpleNamespace(text="partial answer...")
+            raise RuntimeError("connection reset")
+
+    saved_genai = gemini_utils.genai
+    saved_key = os.environ.get("GOOGLE_API_KEY")
+    gemini_utils.genai = types.SimpleNamespace(configure=lambda api_key: None, GenerativeModel=FakeModel)
+    os.environ["GOOGLE_API_KEY"] = "test-key"
+    try:
+        stream = gemini_utils.stream_gemini_response([{"role": "user", "content": "hi"}])
+        parts = []
+        try:
+            while True:
+                parts.append(next(stream))
+        except StopIteration as stop:
+            failed = stop.value
+    finally:
+        gemini_utils.genai = saved_genai
+        if saved_key is None:
+            del os.environ["GOOGLE_API_KEY"]
+        else:
+            os.environ["GOOGLE_API_KEY"] = saved_key
+
+    assert parts == ["partial answer...", "[Error from Gemini: connection reset]"]
+    assert failed is True
+    print("✅ Mid-stream failures are reported out of band")
+
+def test_gemini_entry_points_truncate_oversized_prompts():
+    """Test that every Gemini entry point cuts prompts over 1M characters."""
+    print("🧪 Testing Gemini prompt size guard...")
+
+    import asyncio
+    import types
+    import gemini_utils
+
+    sent = []
+
+    class FakeModel:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, contents, stream=False):
+            sent.append(sum(len(str(c)) for c in contents))
+            reply = types.SimpleNamespace(text="ok")
+            return iter([reply]) if stream else reply
+
+        async def generate_content_async(self, contents):
+            return self.generate_content(contents)
+
+    history = [{"role": "user", "content": "x" * 1200000}]
+    saved_genai = gemini_utils.genai
+    saved_key = os.environ.get("GOOGLE_API_KEY")
+    gemini_utils.genai = types.SimpleNamespace(configure=lambda api_key: None, GenerativeModel=FakeModel)
+    os.environ["GOOGLE_API_KEY"] = "test-key"
+    try:
+        assert gemini_utils.generate_gemini_response(history) == "ok"
+        assert asyncio.run(gemini_utils.generate_gemini_response_async(history)) == "ok"
+        assert list(gemini_utils.stream_gemini_response(history)) == ["ok"]
+    finally:
+        gemini_utils.genai = saved_genai
+        if saved_key is None:
+            del os.environ["GOOGLE_API_KEY"]
+        else:
+            os.environ["GOOGLE_API_KEY"] = saved_key
+
+    assert len(sent) == 3
+    assert all(800000 <= size < 800100 for size in sent), sent
+    print("✅ Oversized prompts are truncated on every Gemini entry point")
+
+if __name__ == "__main__":
+    test_is_error_response_detects_provider_errors()
+    test_is_error_response_accepts_model_output()
+    test_stream_helpers_flag_errors()
+    test_stream_flags_error_after_partial_output()
+    test_gemini_entry_points_truncate_oversized_prompts()